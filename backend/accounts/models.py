@@ -1,6 +1,11 @@
 from django.conf import settings
+from django.core.cache import cache
 from django.db import models
 
+# AI prompt settings change only through the settings pages; cached entries
+# are dropped on every profile save (accounts.signals).
+_PROMPT_SETTINGS_CACHE_SECONDS = 60 * 60
+
 
 class SubscriberProfile(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="subscriber_profile")
@@ -25,3 +30,36 @@ class SubscriberProfile(models.Model):
     def get_for_user(cls, user):
         obj, _ = cls.objects.get_or_create(user=user)
         return obj
+
+    @staticmethod
+    def prompt_settings_cache_key(user_id: int) -> str:
+        return f"prompt_settings:{user_id}"
+
+    def prompt_settings(self) -> dict:
+        """Keyword arguments for lessons.ai.answer_question*()."""
+        return {
+            "max_sentences": self.max_sentences,
+            "persona": self.ai_persona,
+            "description": self.ai_description,
+        }
+
+    @classmethod
+    def get_prompt_settings(cls, user) -> dict:
+        """
+        A user's prompt settings without touching the database on the hot path.
+
+        Cached per user and memoized on the user object, so each request
+        resolves them at most once.
+        """
+        memo = getattr(user, "_prompt_settings", None)
+        if memo is not None:
+            return memo
+
+        key = cls.prompt_settings_cache_key(user.pk)
+        prompt_settings = cache.get(key)
+        if prompt_settings is None:
+            prompt_settings = cls.get_for_user(user).prompt_settings()
+            cache.set(key, prompt_settings, _PROMPT_SETTINGS_CACHE_SECONDS)
+
+        user._prompt_settings = prompt_settings
+        return prompt_settings
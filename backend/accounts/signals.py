@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from .models import SubscriberProfile
@@ -12,3 +13,9 @@ def _create_profile_for_new_user(sender, instance, created, **kwargs):
     if not created:
         return
     SubscriberProfile.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=SubscriberProfile)
+@receiver(post_delete, sender=SubscriberProfile)
+def _forget_prompt_settings(sender, instance, **kwargs):
+    cache.delete(SubscriberProfile.prompt_settings_cache_key(instance.user_id))
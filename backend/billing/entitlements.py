@@ -2,6 +2,7 @@ from datetime import datetime, timedelta, timezone as dt_timezone
 
 import stripe
 from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 
 from .models import BillingPlan, StripeSubscription
@@ -10,6 +11,13 @@ from .models import BillingPlan, StripeSubscription
 _ACTIVE_STATUSES = {"active", "trialing"}
 _STRIPE_REFRESH_TTL = timedelta(minutes=1)
 
+# Cached result of user_has_active_subscription(). Entitled users are cached
+# longer (but never past the paid period); non-entitled users are re-checked
+# sooner so a completed checkout shows up even if its webhook is late.
+# Webhook syncs invalidate the entry (see billing.signals).
+_ENTITLED_CACHE_SECONDS = 5 * 60
+_NOT_ENTITLED_CACHE_SECONDS = 60
+
 
 def _stripe_init() -> None:
     stripe.api_key = settings.STRIPE_SECRET_KEY
@@ -71,16 +79,45 @@ def billing_is_configured() -> bool:
     )
 
 
-def user_has_active_subscription(user) -> bool:
-    if not billing_is_configured():
-        return True
+def _entitlement_cache_key(user_id: int) -> str:
+    return f"entitlement:{user_id}"
+
+
+def invalidate_entitlement(user_id: int) -> None:
+    """Forget the cached entitlement for a user (call after subscription changes)."""
+    cache.delete(_entitlement_cache_key(user_id))
 
+
+def _check_subscription(user) -> StripeSubscription | None:
     sub = getattr(user, "stripe_subscription", None)
     if sub and sub.status in _ACTIVE_STATUSES:
+        return sub
+
+    return _sync_latest_subscription_from_stripe(user, sub)
+
+
+def user_has_active_subscription(user) -> bool:
+    if not billing_is_configured():
         return True
 
-    sub = _sync_latest_subscription_from_stripe(user, sub)
-    if not sub:
+    if user.pk is None:
         return False
 
-    return sub.status in _ACTIVE_STATUSES
+    key = _entitlement_cache_key(user.pk)
+    entitled = cache.get(key)
+    if entitled is not None:
+        return entitled
+
+    sub = _check_subscription(user)
+    entitled = bool(sub and sub.status in _ACTIVE_STATUSES)
+
+    if entitled:
+        ttl = _ENTITLED_CACHE_SECONDS
+        if sub.current_period_end:
+            remaining = (sub.current_period_end - timezone.now()).total_seconds()
+            if remaining > 0:
+                ttl = min(ttl, int(remaining) + 1)
+    else:
+        ttl = _NOT_ENTITLED_CACHE_SECONDS
+    cache.set(key, entitled, ttl)
+    return entitled
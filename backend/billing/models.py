@@ -1,4 +1,9 @@
+import threading
+import time
+import uuid
+
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
@@ -6,6 +11,14 @@ from django.utils import timezone
 
 import stripe
 
+# Per-process copy of the BillingPlan singleton (see BillingPlan.get_solo)
+_SOLO_VERSION_KEY = "billing_plan:version"
+_SOLO_RECHECK_SECONDS = 5
+_SOLO_MAX_AGE_SECONDS = 10 * 60
+
+_solo_lock = threading.Lock()
+_solo = {"plan": None, "version": None, "loaded_at": 0.0, "checked_at": 0.0}
+
 
 class BillingPlan(models.Model):
     name = models.CharField(max_length=64, default="Monthly")
@@ -24,6 +37,41 @@ class BillingPlan(models.Model):
 
     @classmethod
     def get_solo(cls) -> "BillingPlan":
+        """
+        The billing plan, served from a per-process copy.
+
+        The copy is reloaded when the plan's version key in the cache changes
+        (bumped on every save/delete, see billing.signals), or after
+        _SOLO_MAX_AGE_SECONDS as a fallback. The version key itself is only
+        consulted every _SOLO_RECHECK_SECONDS. Treat the result as read-only;
+        edit the plan through a freshly fetched row.
+        """
+        now = time.monotonic()
+        with _solo_lock:
+            plan, version, loaded_at, checked_at = (
+                _solo["plan"], _solo["version"], _solo["loaded_at"], _solo["checked_at"],
+            )
+        if plan is not None and now - checked_at < _SOLO_RECHECK_SECONDS:
+            return plan
+
+        current_version = cache.get_or_set(_SOLO_VERSION_KEY, lambda: uuid.uuid4().hex, None)
+        if plan is None or version != current_version or now - loaded_at >= _SOLO_MAX_AGE_SECONDS:
+            plan = cls._load_solo()
+            loaded_at = now
+
+        with _solo_lock:
+            _solo.update(plan=plan, version=current_version, loaded_at=loaded_at, checked_at=now)
+        return plan
+
+    @classmethod
+    def invalidate_solo(cls) -> None:
+        """Drop the per-process copy here and, via the version key, in every process."""
+        cache.set(_SOLO_VERSION_KEY, uuid.uuid4().hex, None)
+        with _solo_lock:
+            _solo["plan"] = None
+
+    @classmethod
+    def _load_solo(cls) -> "BillingPlan":
         obj, _ = cls.objects.get_or_create(
             id=1,
             defaults={
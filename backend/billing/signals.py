@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .entitlements import invalidate_entitlement
+from .models import BillingPlan, StripeCustomer, StripeSubscription
+
+
+@receiver(post_save, sender=StripeSubscription)
+@receiver(post_delete, sender=StripeSubscription)
+@receiver(post_save, sender=StripeCustomer)
+@receiver(post_delete, sender=StripeCustomer)
+def _billing_record_changed(sender, instance, **kwargs):
+    # Webhook syncs, admin edits and Stripe refreshes all land here
+    invalidate_entitlement(instance.user_id)
+
+
+@receiver(post_save, sender=BillingPlan)
+@receiver(post_delete, sender=BillingPlan)
+def _billing_plan_changed(sender, instance, **kwargs):
+    BillingPlan.invalidate_solo()
@@ -15,7 +15,7 @@ from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 
-from .entitlements import billing_is_configured, user_has_active_subscription
+from .entitlements import billing_is_configured, invalidate_entitlement, user_has_active_subscription
 from .models import BillingPlan, CouponCode, StripeCustomer, StripeEvent, StripeSubscription
 
 
@@ -97,6 +97,7 @@ def _get_or_create_customer(user) -> StripeCustomer:
 
 
 def _sync_subscription_for_user(user, sub: dict) -> StripeSubscription:
+    # Saving the row also drops the user's cached entitlement (billing.signals)
     obj, _ = StripeSubscription.objects.get_or_create(user=user)
 
     obj.stripe_subscription_id = sub.get("id") or obj.stripe_subscription_id
@@ -257,6 +258,8 @@ def create_billing_portal_session(request: HttpRequest) -> HttpResponse:
 
 @login_required
 def billing_success(request: HttpRequest) -> HttpResponse:
+    # Checkout just completed; don't serve a cached "not subscribed" while the webhook is in flight
+    invalidate_entitlement(request.user.id)
     return render(request, "billing/success.html")
 
 
@@ -4,6 +4,7 @@ import uuid
 from datetime import timedelta
 
 from django.conf import settings
+from django.core.cache import cache
 from django.db import models
 from django.utils import timezone
 
@@ -29,11 +30,32 @@ class Device(models.Model):
     def revoke(self) -> None:
         self.revoked_at = timezone.now()
         self.save(update_fields=["revoked_at"])
+        self.forget_cached_token()
+
+    @classmethod
+    def revoke_all_for_user(cls, user) -> int:
+        """Revoke every active device of `user`. Returns the number revoked."""
+        active = list(cls.objects.filter(user=user, revoked_at__isnull=True).values_list("id", "token_hash"))
+        if not active:
+            return 0
+        count = cls.objects.filter(id__in=[device_id for device_id, _ in active]).update(revoked_at=timezone.now())
+        cache.delete_many([cls.token_cache_key(device_id, token_hash) for device_id, token_hash in active])
+        return count
 
     @staticmethod
     def hash_token(raw_token: str) -> str:
         return hashlib.sha256(raw_token.encode()).hexdigest()
 
+    @staticmethod
+    def token_cache_key(device_id, token_hash: str) -> str:
+        """Cache key for a verified token (see devices.tokens.verify_token)."""
+        return f"device_token:{device_id}:{token_hash}"
+
+    def forget_cached_token(self) -> None:
+        """Drop this device's current token from the verified-token cache."""
+        if self.token_hash:
+            cache.delete(self.token_cache_key(self.id, self.token_hash))
+
     def __str__(self) -> str:
         status = "active" if self.is_active else "revoked"
         return f"{self.label or 'Unnamed'} ({status})"
@@ -0,0 +1,67 @@
+"""
+Buffered Device.last_seen_at updates.
+
+Every device-token request used to UPDATE its Device row. Instead,
+mark_seen() records the timestamp in a per-process buffer, and the buffer
+is written with one bulk UPDATE at most once per FLUSH_INTERVAL_SECONDS (and
+at interpreter exit). last_seen_at can therefore lag by up to the interval.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+
+from django.utils import timezone
+
+from .models import Device
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = 60
+
+_lock = threading.Lock()
+_pending: dict = {}  # device id -> last seen datetime
+_last_flush = time.monotonic()
+
+
+def mark_seen(device: Device) -> None:
+    """Record that `device` made a request now; flushes the buffer when due."""
+    global _last_flush
+    device.last_seen_at = timezone.now()
+    with _lock:
+        _pending[device.id] = device.last_seen_at
+        due = time.monotonic() - _last_flush >= FLUSH_INTERVAL_SECONDS
+        if due:
+            _last_flush = time.monotonic()
+    if due:
+        flush()
+
+
+def flush() -> None:
+    """Write all buffered last_seen_at values in one bulk UPDATE."""
+    global _pending
+    with _lock:
+        pending, _pending = _pending, {}
+    if not pending:
+        return
+    try:
+        Device.objects.bulk_update(
+            [Device(id=device_id, last_seen_at=seen_at) for device_id, seen_at in pending.items()],
+            ["last_seen_at"],
+        )
+    except Exception:
+        logger.exception("Failed to flush last_seen_at for %d devices", len(pending))
+
+
+def _reset_after_fork() -> None:
+    # Updates buffered by the parent are flushed by the parent.
+    global _lock, _pending, _last_flush
+    _lock = threading.Lock()
+    _pending = {}
+    _last_flush = time.monotonic()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+atexit.register(flush)
@@ -4,16 +4,29 @@ Device token utilities.
 Tokens are opaque strings: `<device_id>:<random_secret>`.
 The random secret is SHA-256 hashed and stored on the Device row.
 Verification: look up device by ID, hash the incoming secret, compare.
+
+Verified tokens are cached for VERIFIED_TOKEN_CACHE_SECONDS (keyed by device
+id + secret hash), so the desktop app's frequent requests skip the lookup.
+Device.revoke(), Device.revoke_all_for_user() and issue_token() evict the
+cached entry; other changes (e.g. editing revoked_at in the admin) take
+effect when it expires.
 """
 
 import secrets
+import uuid
+
+from django.core.cache import cache
 
 from .models import Device
+from .presence import mark_seen
+
+VERIFIED_TOKEN_CACHE_SECONDS = 60
 
 
 def issue_token(device: Device) -> str:
     """Generate a new token for a device and persist its hash. Returns the raw token."""
     raw_secret = secrets.token_urlsafe(32)
+    device.forget_cached_token()
     device.token_hash = Device.hash_token(raw_secret)
     device.save(update_fields=["token_hash"])
     return f"{device.id}:{raw_secret}"
@@ -25,18 +38,28 @@ def verify_token(raw_token: str) -> Device | None:
         return None
 
     device_id, raw_secret = raw_token.split(":", 1)
-
     try:
-        device = Device.objects.select_related("user").get(id=device_id)
-    except (Device.DoesNotExist, ValueError):
-        return None
-
-    if not device.is_active:
+        device_id = uuid.UUID(device_id)
+    except ValueError:
         return None
 
     expected_hash = Device.hash_token(raw_secret)
-    if device.token_hash != expected_hash:
-        return None
+    cache_key = Device.token_cache_key(device_id, expected_hash)
+
+    device = cache.get(cache_key)
+    if device is None:
+        try:
+            device = Device.objects.select_related("user").get(id=device_id)
+        except Device.DoesNotExist:
+            return None
+
+        if not device.is_active:
+            return None
+
+        if device.token_hash != expected_hash:
+            return None
+
+        cache.set(cache_key, device, VERIFIED_TOKEN_CACHE_SECONDS)
 
-    device.mark_seen()
+    mark_seen(device)
     return device
@@ -29,7 +29,7 @@ def devices_view(request: HttpRequest) -> HttpResponse:
 
     if billing_enforced and not subscription_active:
         now = timezone.now()
-        auto_revoked_count = Device.objects.filter(user=request.user, revoked_at__isnull=True).update(revoked_at=now)
+        auto_revoked_count = Device.revoke_all_for_user(request.user)
         DevicePairingCode.objects.filter(
             user=request.user,
             used_at__isnull=True,
@@ -118,8 +118,7 @@ def api_pair_device(request: HttpRequest) -> JsonResponse:
         return JsonResponse({"error": "Pairing code expired or already used"}, status=410)
 
     if billing_is_configured() and not user_has_active_subscription(pairing_code.user):
-        now = timezone.now()
-        Device.objects.filter(user=pairing_code.user, revoked_at__isnull=True).update(revoked_at=now)
+        Device.revoke_all_for_user(pairing_code.user)
         return JsonResponse({"error": "Subscription required"}, status=403)
 
     # Mark code as used
@@ -1,11 +1,11 @@
 from django.contrib import admin
 
-from .models import Lesson, QuestionAnswer, TranscriptChunk
+from .models import Lesson, QuestionAnswer, TranscriptChunk, UploadJob
 
 
 @admin.register(Lesson)
 class LessonAdmin(admin.ModelAdmin):
-    list_display = ("id", "user", "title", "meeting_id", "meeting_date", "created_at")
+    list_display = ("id", "user", "title", "meeting_id", "meeting_date", "chunk_count", "qa_count", "created_at")
     list_filter = ("meeting_date",)
     search_fields = ("title", "meeting_id", "user__email", "user__username")
 
@@ -22,5 +22,12 @@ class TranscriptChunkAdmin(admin.ModelAdmin):
 
 @admin.register(QuestionAnswer)
 class QuestionAnswerAdmin(admin.ModelAdmin):
-    list_display = ("id", "user", "lesson", "created_at")
+    list_display = ("id", "user", "lesson", "prompt_tokens", "created_at")
     search_fields = ("user__email", "user__username", "question")
+
+
+@admin.register(UploadJob)
+class UploadJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "user", "status", "file_count", "pages_done", "lesson", "created_at")
+    list_filter = ("status",)
+    search_fields = ("user__email", "user__username")
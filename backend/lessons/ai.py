@@ -5,26 +5,112 @@ Uses the student's grade level and max_sentences preferences from their
 SubscriberProfile to tailor the response.
 """
 
+import asyncio
 import logging
+import os
+import re
+import threading
 import time
+import weakref
 
+import httpx
 from django.conf import settings
 
-from openai import OpenAI
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+
+from .retrieval import tokenize
+from .tokens import count_tokens, truncate_tokens
 
 logger = logging.getLogger(__name__)
 
+# Idle keep-alive connections are closed after this long
+_KEEPALIVE_SECONDS = 60
+
+# Prompt allowances; the context gets what is left of PROMPT_TOKEN_BUDGET
+_MAX_INSTRUCTION_TOKENS = 300  # persona and description, each
+_MAX_QUESTION_TOKENS = 1000
+
+# Chat formatting overhead per message, and for priming the reply
+_MESSAGE_OVERHEAD_TOKENS = 4
+_REPLY_OVERHEAD_TOKENS = 3
+
+# Lesson context is "[Page N] ..." blocks joined by newlines (retrieval.format_chunk)
+_PAGE_SPLIT_RE = re.compile(r"\n(?=\[Page \d+\] )")
 
-def _get_client() -> OpenAI:
-    return OpenAI(
-        api_key=settings.OPENAI_API_KEY,
-        timeout=settings.OPENAI_TIMEOUT_SECONDS,
+_client: OpenAI | None = None
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.OPENAI_MAX_CONNECTIONS,
+        keepalive_expiry=_KEEPALIVE_SECONDS,
     )
 
 
-def _build_prompt(question: str, context: str, max_sentences: int,
-                  persona: str = "", description: str = "", source_type: str = "recitation") -> list[dict]:
-    """Build the chat messages for the OpenAI API call.
+def get_client() -> OpenAI:
+    """
+    The process-wide OpenAI client.
+
+    Its connection pool keeps connections to the API alive between requests,
+    so answers and lesson names don't pay for a new TLS handshake each time.
+    Thread-safe; shared by every caller in the process.
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = OpenAI(
+                    api_key=settings.OPENAI_API_KEY,
+                    timeout=settings.OPENAI_TIMEOUT_SECONDS,
+                    http_client=DefaultHttpxClient(limits=_limits()),
+                )
+    return _client
+
+
+def get_async_client() -> AsyncOpenAI:
+    """
+    The AsyncOpenAI client for the running event loop.
+
+    Async connections belong to the loop that opened them, so each loop gets
+    its own pooled client (normally one per ASGI process).
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        with _lock:
+            client = _async_clients.get(loop)
+            if client is None:
+                client = _async_clients[loop] = AsyncOpenAI(
+                    api_key=settings.OPENAI_API_KEY,
+                    timeout=settings.OPENAI_TIMEOUT_SECONDS,
+                    http_client=DefaultAsyncHttpxClient(limits=_limits()),
+                )
+    return client
+
+
+def _reset_after_fork() -> None:
+    # Pooled sockets would be shared with the parent; the child opens its own
+    global _client, _async_clients, _lock
+    _client = None
+    _async_clients = weakref.WeakKeyDictionary()
+    _lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def build_prompt(question: str, context: str, max_sentences: int,
+                 persona: str = "", description: str = "", source_type: str = "recitation") -> tuple[list[dict], int]:
+    """Build the chat messages for the OpenAI API call, within PROMPT_TOKEN_BUDGET.
+    
+    The persona, description and question have fixed allowances (longer ones
+    are truncated); the context gets the rest of the budget. Lesson context
+    drops the pages least related to the question first, recitation context
+    its oldest captions. The budget only limits the context: the instructions
+    and question are always sent, so a budget smaller than them is exceeded.
     
     Args:
         question: The question to answer
@@ -33,7 +119,15 @@ def _build_prompt(question: str, context: str, max_sentences: int,
         persona: AI persona for recitation mode
         description: AI description for recitation mode
         source_type: 'recitation' (live capture) or 'lesson' (uploaded document)
+    
+    Returns:
+        (messages, prompt_tokens): prompt_tokens is counted locally (see lessons.tokens)
     """
+    model = settings.OPENAI_MODEL
+    question = truncate_tokens(question, _MAX_QUESTION_TOKENS, model)
+    persona = truncate_tokens(persona, _MAX_INSTRUCTION_TOKENS, model)
+    description = truncate_tokens(description, _MAX_INSTRUCTION_TOKENS, model)
+
     # Different AI roles based on source type
     if source_type == "lesson":
         # Lesson mode: Act as tutor explaining uploaded document content
@@ -65,25 +159,61 @@ def _build_prompt(question: str, context: str, max_sentences: int,
         )
 
     # Build user message with context
+    fixed_tokens = count_tokens(system_msg, model) + 2 * _MESSAGE_OVERHEAD_TOKENS + _REPLY_OVERHEAD_TOKENS
     user_msg = question
     if context:
         if source_type == "lesson":
-            # Lesson mode: Provide full lesson content as context
-            user_msg = (
-                f"Lesson content:\n{context}\n\n"
-                f"Text from screenshot: {question}"
-            )
+            # Lesson mode: Provide the retrieved lesson pages as context
+            header = "Lesson content:\n"
         else:
             # Recitation mode: Provide recent captions as context
-            user_msg = (
-                f"Recent captions:\n{context}\n\n"
-                f"Text from screenshot: {question}"
-            )
+            header = "Recent captions:\n"
+        footer = f"\n\nText from screenshot: {question}"
+        budget = (
+            settings.PROMPT_TOKEN_BUDGET - fixed_tokens
+            - count_tokens(header, model) - count_tokens(footer, model)
+        )
+        context = _fit_context(context, question, budget, source_type, model)
+        if context:
+            user_msg = f"{header}{context}{footer}"
 
-    return [
+    messages = [
         {"role": "system", "content": system_msg},
         {"role": "user", "content": user_msg},
     ]
+    return messages, fixed_tokens + count_tokens(user_msg, model)
+
+
+def _fit_context(context: str, question: str, budget: int, source_type: str, model: str) -> str:
+    """`context` cut down to `budget` tokens by dropping whole pages or lines."""
+    if count_tokens(context, model) <= budget:
+        return context
+
+    if source_type == "lesson":
+        # Least related pages go first; kept pages stay in document order
+        parts = _PAGE_SPLIT_RE.split(context)
+        terms = set(tokenize(question))
+        order = sorted(range(len(parts)), key=lambda i: (-len(terms.intersection(tokenize(parts[i]))), i))
+    else:
+        # Oldest captions go first; what's kept is the most recent stretch
+        parts = context.split("\n")
+        order = list(reversed(range(len(parts))))
+
+    kept = {}
+    used = 0
+    for i in order:
+        cost = count_tokens(parts[i], model) + 1  # joining newline
+        if used + cost <= budget:
+            kept[i] = parts[i]
+            used += cost
+        elif source_type != "lesson":
+            break
+
+    if not kept and order:
+        # Even the most important part doesn't fit: keep what does of it
+        kept[order[0]] = truncate_tokens(parts[order[0]], budget, model, keep_end=source_type != "lesson")
+
+    return "\n".join(kept[i] for i in sorted(kept))
 
 
 def answer_question(question: str, context: str = "",
@@ -106,6 +236,7 @@ def answer_question(question: str, context: str = "",
             "answer": "The answer text...",
             "model": "gpt-4o-mini",
             "latency_ms": 1234,
+            "prompt_tokens": 850,
         }
     """
     if not settings.OPENAI_API_KEY:
@@ -113,10 +244,11 @@ def answer_question(question: str, context: str = "",
             "answer": "(AI answering not configured — set OPENAI_API_KEY)",
             "model": "",
             "latency_ms": 0,
+            "prompt_tokens": None,
         }
 
-    client = _get_client()
-    messages = _build_prompt(question, context, max_sentences, persona, description, source_type)
+    client = get_client()
+    messages, prompt_tokens = build_prompt(question, context, max_sentences, persona, description, source_type)
     model = settings.OPENAI_MODEL
 
     start = time.time()
@@ -134,6 +266,7 @@ def answer_question(question: str, context: str = "",
             "answer": answer,
             "model": model,
             "latency_ms": latency_ms,
+            "prompt_tokens": prompt_tokens,
         }
     except Exception as e:
         latency_ms = int((time.time() - start) * 1000)
@@ -142,23 +275,16 @@ def answer_question(question: str, context: str = "",
             "answer": f"(AI error: {e})",
             "model": model,
             "latency_ms": latency_ms,
+            "prompt_tokens": prompt_tokens,
         }
 
 
-def answer_question_streaming(question: str, context: str = "",
-                              max_sentences: int = 2,
-                              persona: str = "", description: str = "",
-                              source_type: str = "recitation"):
+def answer_question_streaming(messages: list[dict]):
     """
     Call OpenAI to answer a question with streaming.
     
     Args:
-        question: The question to answer
-        context: Lesson context or recent captions
-        max_sentences: Max sentences in answer
-        persona: AI persona for recitation mode
-        description: AI description for recitation mode
-        source_type: 'recitation' (uses persona) or 'lesson' (uses tutor mode)
+        messages: The chat messages from build_prompt()
 
     Yields answer tokens as strings. The caller can use these for SSE.
     """
@@ -166,8 +292,7 @@ def answer_question_streaming(question: str, context: str = "",
         yield "(AI answering not configured — set OPENAI_API_KEY)"
         return
 
-    client = _get_client()
-    messages = _build_prompt(question, context, max_sentences, persona, description, source_type)
+    client = get_client()
     model = settings.OPENAI_MODEL
 
     try:
@@ -178,10 +303,44 @@ def answer_question_streaming(question: str, context: str = "",
             temperature=0.3,
             stream=True,
         )
-        for chunk in stream:
-            delta = chunk.choices[0].delta
-            if delta.content:
-                yield delta.content
+        # Closing the stream (also when the caller stops early) returns its
+        # connection to the shared pool
+        with stream:
+            for chunk in stream:
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    yield delta.content
+    except Exception as e:
+        logger.error("OpenAI streaming error: %s", e)
+        yield f"(AI error: {e})"
+
+
+async def answer_question_streaming_async(messages: list[dict]):
+    """
+    Async variant of answer_question_streaming() for the ASGI views.
+
+    Same argument; yields answer tokens as strings without blocking the event loop.
+    """
+    if not settings.OPENAI_API_KEY:
+        yield "(AI answering not configured — set OPENAI_API_KEY)"
+        return
+
+    client = get_async_client()
+    model = settings.OPENAI_MODEL
+
+    try:
+        stream = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=300,
+            temperature=0.3,
+            stream=True,
+        )
+        async with stream:
+            async for chunk in stream:
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    yield delta.content
     except Exception as e:
         logger.error("OpenAI streaming error: %s", e)
         yield f"(AI error: {e})"
@@ -0,0 +1,32 @@
+"""
+Answer generation pipeline shared by the question endpoints.
+
+- build_context(): assemble the prompt context for a lesson
+
+Answers themselves are produced by lessons.generation.
+"""
+
+from .models import Lesson
+from .retrieval import retrieve_context
+
+
+def build_context(lesson: Lesson | None, context: str = "", question: str = "") -> str:
+    """
+    Build the prompt context for a question on `lesson`.
+
+    Lesson mode uses the transcript pages most relevant to `question` (with
+    page numbers). Recitation mode uses the session context sent by the
+    desktop app, falling back to the last 10 captions stored for the lesson.
+    """
+    if lesson is None:
+        return context
+
+    if lesson.source_type == Lesson.SOURCE_LESSON:
+        return retrieve_context(lesson, question)
+
+    if context:
+        return context
+
+    recent_chunks = lesson.transcript_chunks.order_by("-created_at")[:10]
+    return "\n".join(c.text for c in reversed(recent_chunks))
+
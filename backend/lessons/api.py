@@ -3,25 +3,31 @@ API views for caption ingestion, question submission, and document upload.
 
 Device token endpoints (X-Device-Token header):
 - POST /api/captions/
+- POST /api/captions/batch/
 - POST /api/questions/
+- GET /api/questions/<id>/
 - GET /api/lessons/list/
 
 Session auth endpoints (login required):
 - POST /api/lessons/upload/
+- GET /api/uploads/<id>/
+- GET /api/uploads/<id>/stream/
 - GET /api/questions/<id>/stream/
 """
 
 import hashlib
 import json
 import time
-from datetime import date
+from datetime import date, timedelta, timezone as dt_timezone
 
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.cache import cache
-from django.db import IntegrityError
-from django.http import HttpRequest, JsonResponse, StreamingHttpResponse
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max
+from django.http import HttpRequest, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django.utils import timezone
 from django.utils.dateparse import parse_datetime
 from django.views.decorators.csrf import csrf_exempt
@@ -31,13 +37,33 @@ from accounts.models import SubscriberProfile
 from billing.entitlements import user_has_active_subscription
 from devices.auth import require_device_token
 
-from .ai import answer_question, answer_question_streaming
-from .document_processor import (
-    MAX_FILES_PER_UPLOAD,
-    MAX_TOTAL_SIZE_MB,
-    create_lesson_from_uploads,
-)
-from .models import Lesson, QuestionAnswer, TranscriptChunk
+from .ai import answer_question
+from .answering import build_context
+from .document_processor import generate_lesson_name
+from .generation import claim_question, get_generation, is_abandoned, start_generation
+from .models import Lesson, QuestionAnswer, TranscriptChunk, UploadJob
+from .notifications import subscribe
+from .upload_handlers import StagedUploadHandler
+from .uploads import enqueue_upload, fail_if_stale
+from .workers import submit
+
+# How long the answer stream waits for progress on an answer generated by
+# another process, and how long a pending/streaming row may go without a
+# checkpoint before the stream assumes its job was lost (e.g. the process
+# restarted) and generates the answer itself.
+_PENDING_POLL_SECONDS = 0.5
+_PENDING_WAIT_SECONDS = settings.OPENAI_TIMEOUT_SECONDS + 15
+_PENDING_STALE_SECONDS = settings.OPENAI_TIMEOUT_SECONDS * 4
+
+# Idle live-dashboard streams send a keep-alive comment this often
+_LIVE_HEARTBEAT_SECONDS = 15
+
+# Maximum captions accepted by one /api/captions/batch/ request
+_CAPTION_BATCH_MAX = 500
+
+# /api/lessons/list/: bump to invalidate client ETags when the payload changes
+_LESSONS_LIST_FORMAT = 2
+_LESSONS_DELTA_OVERLAP = timedelta(seconds=30)
 
 
 # ---------------------------------------------------------------------------
@@ -51,6 +77,29 @@ def _hash_caption(speaker: str, text: str) -> str:
     return hashlib.sha256(raw.encode()).hexdigest()
 
 
+def _sse(data: dict, event_id: int | None = None) -> str:
+    """Format one SSE event; answer streams use the answer offset as the id."""
+    if event_id is None:
+        return f"data: {json.dumps(data)}\n\n"
+    return f"id: {event_id}\ndata: {json.dumps(data)}\n\n"
+
+
+def _resume_offset(request: HttpRequest) -> int:
+    """Answer offset a reconnecting stream resumes from (SSE Last-Event-ID)."""
+    raw = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id") or ""
+    try:
+        return max(int(raw), 0)
+    except ValueError:
+        return 0
+
+
+def _backfill_lesson_title(lesson_id: int, placeholder: str, text: str) -> None:
+    """Replace a lesson's placeholder title with an AI-generated one (background job)."""
+    title = generate_lesson_name(text)
+    # Only overwrite the placeholder; never clobber a title set in the meantime
+    Lesson.objects.filter(id=lesson_id, title=placeholder).update(title=title, updated_at=timezone.now())
+
+
 def _get_or_create_lesson(user, meeting_id: str, meeting_title: str, meeting_date: date | None = None, first_text: str = "") -> Lesson:
     """
     Get or create a lesson for the given meeting.
@@ -58,30 +107,34 @@ def _get_or_create_lesson(user, meeting_id: str, meeting_title: str, meeting_dat
     If meeting_id is provided, dedup by (user, meeting_id, meeting_date).
     If meeting_id is empty, always create a new lesson.
     
-    If meeting_title is empty and first_text is provided, generate a title from the text.
+    If meeting_title is empty and first_text is provided, a newly created lesson
+    gets a placeholder title that is replaced by an AI-generated one in the
+    background. Existing lessons never trigger title generation.
     """
-    from .document_processor import generate_lesson_name
-    
     today = meeting_date or timezone.now().date()
-    
-    # Generate title from first_text if no meeting_title provided
-    if not meeting_title and first_text:
-        meeting_title = generate_lesson_name(first_text[:500])  # Use first 500 chars for title generation
+    placeholder = f"Capture {today.isoformat()}"
 
     if meeting_id:
-        lesson, _ = Lesson.objects.get_or_create(
+        lesson, created = Lesson.objects.get_or_create(
             user=user,
             meeting_id=meeting_id,
             meeting_date=today,
-            defaults={"title": meeting_title or f"Capture {today.isoformat()}"},
+            defaults={"title": meeting_title or placeholder},
+        )
+    else:
+        lesson = Lesson.objects.create(
+            user=user,
+            title=meeting_title or placeholder,
+            meeting_date=today,
         )
-        return lesson
+        created = True
 
-    return Lesson.objects.create(
-        user=user,
-        title=meeting_title or f"Capture {today.isoformat()}",
-        meeting_date=today,
-    )
+    if created and not meeting_title and first_text:
+        # Use first 500 chars for title generation
+        excerpt = first_text[:500]
+        transaction.on_commit(lambda: submit(_backfill_lesson_title, lesson.id, placeholder, excerpt))
+
+    return lesson
 
 
 # ---------------------------------------------------------------------------
@@ -163,6 +216,134 @@ def api_captions(request: HttpRequest) -> JsonResponse:
     })
 
 
+# ---------------------------------------------------------------------------
+# POST /api/captions/batch/ — Many captions in one round trip
+# ---------------------------------------------------------------------------
+
+
+@csrf_exempt
+@require_POST
+@require_device_token
+def api_captions_batch(request: HttpRequest) -> JsonResponse:
+    """
+    Ingest a batch of caption events (e.g. a client flushing its backlog).
+
+    Request body (JSON):
+        {
+            "meeting_id": "abc-defg-hij",
+            "meeting_title": "Math Class",
+            "lesson_id": 123,                  // optional, overrides auto-create
+            "captions": [
+                {"speaker": "Teacher", "text": "What is 2 + 2?", "captured_at": "2026-02-13T12:30:00Z"},
+                ...
+            ]
+        }
+
+    Response (results in request order):
+        {
+            "lesson_id": 123,
+            "created": 2,
+            "duplicates": 1,
+            "results": [
+                {"chunk_id": 456, "status": "created"},
+                {"chunk_id": 455, "status": "duplicate"},
+                {"chunk_id": null, "status": "invalid", "error": "Missing caption text"}
+            ]
+        }
+    """
+    try:
+        body = json.loads(request.body)
+    except (json.JSONDecodeError, ValueError):
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+
+    captions = body.get("captions")
+    if not isinstance(captions, list) or not captions:
+        return JsonResponse({"error": "Missing captions"}, status=400)
+    if len(captions) > _CAPTION_BATCH_MAX:
+        return JsonResponse({"error": f"Too many captions (max {_CAPTION_BATCH_MAX})"}, status=400)
+
+    meeting_id = body.get("meeting_id", "").strip()
+    meeting_title = body.get("meeting_title", "").strip()
+    lesson_id = body.get("lesson_id")
+
+    # Normalize items; invalid ones are reported, not fatal
+    items = []
+    for caption in captions:
+        text = caption.get("text", "").strip() if isinstance(caption, dict) else ""
+        if not text:
+            items.append(None)
+            continue
+        speaker = caption.get("speaker", "").strip()[:255]
+        captured_at = parse_datetime(caption["captured_at"]) if caption.get("captured_at") else None
+        items.append((speaker, text, _hash_caption(speaker, text), captured_at))
+
+    valid = [item for item in items if item is not None]
+    if not valid:
+        return JsonResponse({"error": "Missing caption text"}, status=400)
+
+    # Resolve lesson once for the whole batch
+    if lesson_id:
+        try:
+            lesson = Lesson.objects.get(id=lesson_id, user=request.user)
+        except Lesson.DoesNotExist:
+            return JsonResponse({"error": "Lesson not found"}, status=404)
+    else:
+        lesson = _get_or_create_lesson(request.user, meeting_id, meeting_title, first_text=valid[0][1])
+
+    hashes = {item[2] for item in valid}
+    existing = dict(
+        TranscriptChunk.objects.filter(lesson=lesson, content_hash__in=hashes)
+        .values_list("content_hash", "id")
+    )
+
+    # One row per new hash (the batch itself may repeat a caption)
+    new_chunks = {}
+    for speaker, text, content_hash, captured_at in valid:
+        if content_hash not in existing and content_hash not in new_chunks:
+            new_chunks[content_hash] = TranscriptChunk(
+                lesson=lesson,
+                speaker=speaker,
+                text=text,
+                content_hash=content_hash,
+                captured_at=captured_at,
+            )
+
+    stored = {}
+    if new_chunks:
+        # Rows inserted concurrently by another request are skipped by the
+        # unique_chunk_per_lesson constraint instead of failing the batch
+        TranscriptChunk.objects.bulk_create(new_chunks.values(), ignore_conflicts=True)
+        stored = dict(
+            TranscriptChunk.objects.filter(lesson=lesson, content_hash__in=new_chunks.keys())
+            .values_list("content_hash", "id")
+        )
+        # bulk_create skips the post_save signal that versions and counts lesson
+        # content; with conflicts ignored we don't know how many rows landed, so recount
+        Lesson.recount_chunks(lesson.id)
+
+    results = []
+    created_count = 0
+    claimed = set()
+    for item in items:
+        if item is None:
+            results.append({"chunk_id": None, "status": "invalid", "error": "Missing caption text"})
+            continue
+        content_hash = item[2]
+        if content_hash in new_chunks and content_hash not in claimed:
+            claimed.add(content_hash)
+            created_count += 1
+            results.append({"chunk_id": stored.get(content_hash), "status": "created"})
+        else:
+            results.append({"chunk_id": existing.get(content_hash) or stored.get(content_hash), "status": "duplicate"})
+
+    return JsonResponse({
+        "lesson_id": lesson.id,
+        "created": created_count,
+        "duplicates": len(valid) - created_count,
+        "results": results,
+    })
+
+
 # ---------------------------------------------------------------------------
 # POST /api/questions/
 # ---------------------------------------------------------------------------
@@ -185,11 +366,16 @@ def api_questions(request: HttpRequest) -> JsonResponse:
             "meeting_title": "Biology Class",
             "lesson_id": 123,              // optional, overrides auto-create
             "persona": "You are a grade 3 student",  // optional, overrides user settings
-            "description": "Help me impress my teacher"  // optional, overrides user settings
+            "description": "Help me impress my teacher",  // optional, overrides user settings
+            "async": true                  // optional, defaults to settings.ASYNC_ANSWERS
         }
 
     Response:
-        {"question_id": 789, "lesson_id": 123, "answer": "...", "latency_ms": 1234}
+        {"question_id": 789, "lesson_id": 123, "answer": "...", "latency_ms": 1234, "status": "done"}
+
+    In async mode the question is stored and the response (202) returns
+    immediately with "status": "pending"; a background worker fills in the
+    answer, which is read via GET /api/questions/<id>/ or the SSE stream.
     """
     try:
         body = json.loads(request.body)
@@ -204,6 +390,7 @@ def api_questions(request: HttpRequest) -> JsonResponse:
     meeting_id = body.get("meeting_id", "").strip()
     meeting_title = body.get("meeting_title", "").strip()
     lesson_id = body.get("lesson_id")
+    async_mode = bool(body.get("async", settings.ASYNC_ANSWERS))
     
     # AI customization (optional, overrides user settings)
     persona = body.get("persona", "").strip()
@@ -234,46 +421,46 @@ def api_questions(request: HttpRequest) -> JsonResponse:
             pass  # already stored
 
     # Get user preferences for AI prompt
-    profile = SubscriberProfile.get_for_user(request.user)
+    prompt_settings = SubscriberProfile.get_prompt_settings(request.user)
 
     if not user_has_active_subscription(request.user):
         return JsonResponse({"error": "Subscription required"}, status=403)
 
     # Gather transcript context based on lesson source type
-    full_context = context
-    if lesson:
-        if lesson.source_type == "lesson":
-            # Lesson mode: Use full lesson transcript as context
-            all_chunks = lesson.transcript_chunks.order_by("created_at")
-            chunk_texts = []
-            for chunk in all_chunks:
-                if chunk.page_number:
-                    chunk_texts.append(f"[Page {chunk.page_number}] {chunk.text}")
-                else:
-                    chunk_texts.append(chunk.text)
-            full_context = "\n".join(chunk_texts)
-        else:
-            # Recitation mode: Use provided context (session context from desktop app)
-            # If no context provided, fall back to recent captions from database
-            if not context:
-                recent_chunks = lesson.transcript_chunks.order_by("-created_at")[:10]
-                chunk_texts = [c.text for c in reversed(recent_chunks)]
-                full_context = "\n".join(chunk_texts)
-            # else: use the provided context (already set above)
+    full_context = build_context(lesson, context, question=question_text)
 
     # Use persona/description from request, fallback to user settings
-    final_persona = persona or profile.ai_persona
-    final_description = description or profile.ai_description
+    prompt = {
+        "question": question_text,
+        "context": full_context,
+        "max_sentences": prompt_settings["max_sentences"],
+        "persona": persona or prompt_settings["persona"],
+        "description": description or prompt_settings["description"],
+        "source_type": lesson.source_type,
+    }
+
+    if async_mode:
+        # Store the question now; a background worker streams in the answer,
+        # which dashboard streams in this process can attach to live
+        qa = QuestionAnswer.objects.create(
+            user=request.user,
+            lesson=lesson,
+            question=question_text,
+            answer="",
+            status=QuestionAnswer.STATUS_PENDING,
+        )
+        transaction.on_commit(lambda: start_generation(qa.id, prompt))
+
+        return JsonResponse({
+            "question_id": qa.id,
+            "lesson_id": lesson.id if lesson else None,
+            "answer": "",
+            "latency_ms": None,
+            "status": qa.status,
+        }, status=202)
 
     # Call OpenAI synchronously
-    ai_result = answer_question(
-        question=question_text,
-        context=full_context,
-        max_sentences=profile.max_sentences,
-        persona=final_persona,
-        description=final_description,
-        source_type=lesson.source_type,
-    )
+    ai_result = answer_question(**prompt)
 
     # Store the question + answer
     qa = QuestionAnswer.objects.create(
@@ -283,6 +470,7 @@ def api_questions(request: HttpRequest) -> JsonResponse:
         answer=ai_result["answer"],
         model=ai_result["model"],
         latency_ms=ai_result["latency_ms"],
+        prompt_tokens=ai_result["prompt_tokens"],
     )
 
     return JsonResponse({
@@ -290,6 +478,41 @@ def api_questions(request: HttpRequest) -> JsonResponse:
         "lesson_id": lesson.id if lesson else None,
         "answer": ai_result["answer"],
         "latency_ms": ai_result["latency_ms"],
+        "status": qa.status,
+    })
+
+
+# ---------------------------------------------------------------------------
+# GET /api/questions/<id>/ — Answer lookup for the desktop app
+# ---------------------------------------------------------------------------
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+@require_device_token
+def api_question_detail(request: HttpRequest, question_id: int) -> JsonResponse:
+    """
+    Return a question and its answer (if generated yet).
+
+    Used by the desktop app to read answers submitted in async mode.
+
+    Response:
+        {"question_id": 789, "lesson_id": 123, "status": "pending"|"streaming"|"done",
+         "answer": "...", "latency_ms": 1234}
+
+    While "streaming", "answer" holds the latest partial-answer checkpoint.
+    """
+    try:
+        qa = QuestionAnswer.objects.get(id=question_id, user=request.user)
+    except QuestionAnswer.DoesNotExist:
+        return JsonResponse({"error": "Question not found"}, status=404)
+
+    return JsonResponse({
+        "question_id": qa.id,
+        "lesson_id": qa.lesson_id,
+        "status": qa.status,
+        "answer": qa.answer,
+        "latency_ms": qa.latency_ms,
     })
 
 
@@ -305,6 +528,12 @@ def api_question_stream(request: HttpRequest, question_id: int) -> StreamingHttp
 
     Used by the Django dashboard to display live-streaming answers.
     Requires the user to be logged in (session auth).
+
+    Each token event carries the answer's character offset after it as its
+    SSE id. A reconnecting EventSource sends it back as Last-Event-ID (or
+    ?last_event_id=) and the stream resumes from there without a new OpenAI
+    call. An event with "reset": true means the answer was regenerated: the
+    client drops what it has and the event's token starts from offset 0.
     """
     if not request.user.is_authenticated:
         return JsonResponse({"error": "Authentication required"}, status=401)
@@ -314,68 +543,77 @@ def api_question_stream(request: HttpRequest, question_id: int) -> StreamingHttp
     except QuestionAnswer.DoesNotExist:
         return JsonResponse({"error": "Question not found"}, status=404)
 
-    # If already answered, return the stored answer as a single SSE event
-    if qa.answer:
+    offset = _resume_offset(request)
+
+    # If already answered, return the (rest of the) stored answer as a single SSE event
+    if qa.has_answer:
         def already_answered():
-            yield f"data: {json.dumps({'token': qa.answer, 'done': True})}\n\n"
+            if offset <= len(qa.answer):
+                data = {'token': qa.answer[offset:], 'done': True}
+            else:
+                data = {'token': qa.answer, 'reset': True, 'done': True}
+            yield _sse(data, len(qa.answer))
         return StreamingHttpResponse(
             already_answered(),
             content_type="text/event-stream",
         )
 
-    if not user_has_active_subscription(request.user):
-        def not_subscribed():
-            yield f"data: {json.dumps({'error': 'subscription_required', 'done': True})}\n\n"
-        return StreamingHttpResponse(
-            not_subscribed(),
-            content_type="text/event-stream",
-        )
-
-    # Stream from OpenAI
-    profile = SubscriberProfile.get_for_user(request.user)
-
-    # Build context based on lesson source type
-    full_context = ""
-    if qa.lesson:
-        if qa.lesson.source_type == "lesson":
-            # Lesson mode: Use full lesson transcript as context
-            all_chunks = qa.lesson.transcript_chunks.order_by("created_at")
-            chunk_texts = []
-            for chunk in all_chunks:
-                if chunk.page_number:
-                    chunk_texts.append(f"[Page {chunk.page_number}] {chunk.text}")
-                else:
-                    chunk_texts.append(chunk.text)
-            full_context = "\n".join(chunk_texts)
-        else:
-            # Recitation mode: Use recent captions as context
-            recent_chunks = qa.lesson.transcript_chunks.order_by("-created_at")[:10]
-            chunk_texts = [c.text for c in reversed(recent_chunks)]
-            full_context = "\n".join(chunk_texts)
+    # Attach to this process's in-flight generation, if any, so concurrent
+    # streams (second tab, live page, reconnect) share one OpenAI call.
+    running = get_generation(qa.id)
+
+    if running is None:
+        # Answer is being generated by another process (or this process's
+        # generation just finished): follow its checkpoints in the database
+        # instead of paying for a second OpenAI call.
+        follow = not is_abandoned(qa, _PENDING_STALE_SECONDS)
+
+        if not follow:
+            if not user_has_active_subscription(request.user):
+                def not_subscribed():
+                    yield f"data: {json.dumps({'error': 'subscription_required', 'done': True})}\n\n"
+                return StreamingHttpResponse(
+                    not_subscribed(),
+                    content_type="text/event-stream",
+                )
+            # Another process may take over the abandoned row first
+            follow = not claim_question(qa)
+
+        if follow:
+            response = StreamingHttpResponse(_follow_answer(qa.id, offset), content_type="text/event-stream")
+            response["Cache-Control"] = "no-cache"
+            response["X-Accel-Buffering"] = "no"
+            return response
+
+        # Stream from OpenAI
+        prompt_settings = SubscriberProfile.get_prompt_settings(request.user)
+
+        # Build context based on lesson source type
+        full_context = build_context(qa.lesson, question=qa.question)
+
+        running = start_generation(qa.id, {
+            "question": qa.question,
+            "context": full_context,
+            "source_type": qa.lesson.source_type if qa.lesson else "recitation",
+            **prompt_settings,
+        })
 
     def stream_tokens():
-        full_answer = []
-        start = time.time()
-        for token in answer_question_streaming(
-            question=qa.question,
-            context=full_context,
-            max_sentences=profile.max_sentences,
-            persona=profile.ai_persona,
-            description=profile.ai_description,
-            source_type=qa.lesson.source_type if qa.lesson else "recitation",
-        ):
-            full_answer.append(token)
-            yield f"data: {json.dumps({'token': token, 'done': False})}\n\n"
-
-        # Persist the complete answer
-        answer_text = "".join(full_answer)
-        latency_ms = int((time.time() - start) * 1000)
-        qa.answer = answer_text
-        qa.model = settings.OPENAI_MODEL
-        qa.latency_ms = latency_ms
-        qa.save(update_fields=["answer", "model", "latency_ms"])
-
-        yield f"data: {json.dumps({'token': '', 'done': True})}\n\n"
+        # The generation persists the answer itself when it finishes. An
+        # offset past its end belongs to an earlier, abandoned attempt.
+        reset = offset > running.length
+        for item in running.iter_text(0 if reset else offset):
+            if item is None:
+                yield ": waiting\n\n"
+                continue
+            end, text = item
+            data = {'token': text, 'done': False}
+            if reset:
+                data['reset'] = True
+                reset = False
+            yield _sse(data, end)
+
+        yield _sse({'token': '', 'done': True})
 
     response = StreamingHttpResponse(stream_tokens(), content_type="text/event-stream")
     response["Cache-Control"] = "no-cache"
@@ -383,6 +621,35 @@ def api_question_stream(request: HttpRequest, question_id: int) -> StreamingHttp
     return response
 
 
+def _follow_answer(qa_id: int, offset: int):
+    """
+    SSE generator that follows an answer produced by another process.
+
+    Emits the checkpointed answer text past `offset` as it grows and ends
+    once the row is done, or with answer_timeout if it stops making progress.
+    """
+    sent = offset
+    deadline = time.time() + _PENDING_WAIT_SECONDS
+    while time.time() < deadline:
+        row = QuestionAnswer.objects.filter(id=qa_id).values_list("answer", "status").first()
+        if row is None:
+            break
+        answer, status = row
+        if len(answer) > sent:
+            yield _sse({'token': answer[sent:], 'done': False}, len(answer))
+            sent = len(answer)
+            deadline = time.time() + _PENDING_WAIT_SECONDS
+        if status == QuestionAnswer.STATUS_DONE:
+            if len(answer) < sent:
+                # Regenerated since the client's last event
+                yield _sse({'token': answer, 'reset': True, 'done': False}, len(answer))
+            yield _sse({'token': '', 'done': True})
+            return
+        yield ": waiting\n\n"
+        time.sleep(_PENDING_POLL_SECONDS)
+    yield _sse({'error': 'answer_timeout', 'done': True})
+
+
 # ---------------------------------------------------------------------------
 # GET /api/sessions/live/ — SSE stream for new questions (live dashboard)
 # ---------------------------------------------------------------------------
@@ -394,7 +661,9 @@ def api_sessions_live(request: HttpRequest) -> StreamingHttpResponse:
     SSE endpoint that streams new question events for the live dashboard.
     
     Listens for new questions created by desktop app and broadcasts them
-    to the live dashboard for real-time display.
+    to the live dashboard for real-time display. The stream sleeps on the
+    process-wide notification hub (Postgres LISTEN/NOTIFY) and only queries
+    the database when a question event for this user arrives.
     
     Query params:
         mode: 'recitation' or 'lesson'
@@ -407,56 +676,64 @@ def api_sessions_live(request: HttpRequest) -> StreamingHttpResponse:
         return JsonResponse({"error": "Authentication required"}, status=401)
     
     from datetime import date
-    import time as time_module
     
     mode = request.GET.get('mode', 'recitation')
     lesson_id = request.GET.get('lesson_id')
+    user = request.user
+
+    def resolve_target_lesson():
+        if mode == 'lesson' and lesson_id:
+            return Lesson.objects.filter(id=lesson_id, user=user).first()
+        # Recitation mode: Monitor today's session
+        return Lesson.objects.filter(
+            user=user,
+            source_type=Lesson.SOURCE_RECITATION,
+            created_at__date=date.today()
+        ).order_by('-created_at').first()
     
     def stream_new_questions():
-        """Poll for new questions and stream them as SSE events."""
-        last_check = time_module.time()
-        sent_ids = set()
-        
-        # Send heartbeat every 15 seconds to keep connection alive
-        while True:
-            # Determine which lesson to monitor
+        """Wait for question events and stream new questions as SSE events."""
+        subscription = subscribe(user.id)
+        try:
             target_lesson = None
             if mode == 'lesson' and lesson_id:
-                try:
-                    target_lesson = Lesson.objects.get(id=lesson_id, user=request.user)
-                except Lesson.DoesNotExist:
+                target_lesson = resolve_target_lesson()
+                if target_lesson is None:
                     yield f"data: {json.dumps({'error': 'lesson_not_found'})}\n\n"
                     return
-            else:
-                # Recitation mode: Monitor today's session
-                today = date.today()
-                target_lesson = Lesson.objects.filter(
-                    user=request.user,
-                    source_type=Lesson.SOURCE_RECITATION,
-                    created_at__date=today
-                ).order_by('-created_at').first()
-            
-            if target_lesson:
-                # Get new questions since last check
-                new_qas = target_lesson.qas.filter(
-                    id__gt=max(sent_ids) if sent_ids else 0
-                ).order_by('created_at')
-                
-                for qa in new_qas:
-                    if qa.id not in sent_ids:
-                        sent_ids.add(qa.id)
-                        yield f"data: {json.dumps({
-                            'question_id': qa.id,
-                            'question_text': qa.question,
-                            'lesson_id': target_lesson.id,
-                            'timestamp': qa.created_at.isoformat()
-                        })}\n\n"
-            
-            # Heartbeat to keep connection alive
-            yield f": heartbeat\n\n"
-            
-            # Wait 2 seconds before next poll
-            time_module.sleep(2)
+
+            last_id = 0
+            event = {"type": "resync"}  # send existing questions on connect
+            while True:
+                if event is None:
+                    # Heartbeat to keep connection alive
+                    yield ": heartbeat\n\n"
+                else:
+                    if mode != 'lesson' and (
+                        event.get("type") == "resync"
+                        or target_lesson is None
+                        or event.get("lesson_id") != target_lesson.id
+                    ):
+                        # Today's recitation lesson may have been created since we connected
+                        target_lesson = resolve_target_lesson()
+
+                    relevant = event.get("type") == "resync" or (
+                        target_lesson is not None and event.get("lesson_id") == target_lesson.id
+                    )
+                    if target_lesson is not None and relevant:
+                        new_qas = target_lesson.qas.filter(id__gt=last_id).order_by('id')
+                        for qa in new_qas:
+                            last_id = qa.id
+                            yield f"data: {json.dumps({
+                                'question_id': qa.id,
+                                'question_text': qa.question,
+                                'lesson_id': target_lesson.id,
+                                'timestamp': qa.created_at.isoformat()
+                            })}\n\n"
+
+                event = subscription.get(timeout=_LIVE_HEARTBEAT_SECONDS)
+        finally:
+            subscription.close()
     
     response = StreamingHttpResponse(stream_new_questions(), content_type="text/event-stream")
     response["Cache-Control"] = "no-cache"
@@ -476,18 +753,17 @@ def api_lessons_upload(request: HttpRequest) -> JsonResponse:
     """
     Upload images/PDFs for OCR transcription and lesson creation.
     
-    Web dashboard only (session auth required).
+    Web dashboard only (session auth required). The files are processed in
+    the background; follow the job with GET /api/uploads/<job_id>/stream/.
     
     Request:
         multipart/form-data with files
     
-    Response:
+    Response (202):
         {
-            "lesson_id": 123,
-            "lesson_name": "Introduction to Photosynthesis",
-            "pages_processed": 15,
-            "processing_time_ms": 12340,
-            "errors": ["file1.pdf: corrupted", ...]
+            "job_id": 42,
+            "status": "queued",
+            "stream_url": "/api/uploads/42/stream/"
         }
     """
     # Check subscription
@@ -503,47 +779,101 @@ def api_lessons_upload(request: HttpRequest) -> JsonResponse:
             "error": "Rate limit exceeded. Max 50 uploads per day."
         }, status=429)
     
-    # Get uploaded files
+    # Stream the files to disk, validating each as it arrives
+    handler = StagedUploadHandler(request)
+    request.upload_handlers = [handler]
     files = request.FILES.getlist('files')
     
+    if handler.abort_reason:
+        handler.cleanup()
+        return JsonResponse({"error": handler.abort_reason}, status=400)
+    
     if not files:
+        handler.cleanup()
+        if handler.errors:
+            return JsonResponse({"error": "No valid files uploaded", "errors": handler.errors}, status=400)
         return JsonResponse({"error": "No files uploaded"}, status=400)
     
-    if len(files) > MAX_FILES_PER_UPLOAD:
-        return JsonResponse({
-            "error": f"Too many files. Max {MAX_FILES_PER_UPLOAD} files per upload."
-        }, status=400)
+    # Queue processing
+    job = enqueue_upload(request.user, files, staging_dir=handler.staging_dir, errors=handler.errors)
     
-    # Check total size
-    total_size = sum(f.size for f in files)
-    max_size_bytes = MAX_TOTAL_SIZE_MB * 1024 * 1024
+    # Increment rate limit counter (expires in 24 hours)
+    cache.set(cache_key, upload_count + 1, 86400)
     
-    if total_size > max_size_bytes:
-        return JsonResponse({
-            "error": f"Total file size too large: {total_size / 1024 / 1024:.1f}MB > {MAX_TOTAL_SIZE_MB}MB"
-        }, status=400)
+    return JsonResponse({
+        "job_id": job.id,
+        "status": job.status,
+        "stream_url": reverse("lessons:api_upload_stream", args=[job.id]),
+    }, status=202)
+
+
+# ---------------------------------------------------------------------------
+# GET /api/uploads/<id>/ — Upload job status
+# GET /api/uploads/<id>/stream/ — SSE upload progress
+# ---------------------------------------------------------------------------
+
+
+@login_required
+def api_upload_job(request: HttpRequest, job_id: int) -> JsonResponse:
+    """
+    Current state of an upload job.
     
-    # Process files
-    try:
-        filenames = [f.name for f in files]
-        result = create_lesson_from_uploads(request.user, files, filenames)
-        
-        # Increment rate limit counter (expires in 24 hours)
-        cache.set(cache_key, upload_count + 1, 86400)
-        
-        return JsonResponse({
-            "lesson_id": result['lesson_id'],
-            "lesson_name": result['lesson_name'],
-            "pages_processed": result['pages_processed'],
-            "processing_time_ms": result['total_processing_time_ms'],
-            "errors": result['errors'],
-        })
+    Response:
+        {"job_id": 42, "status": "processing", "file_count": 3, "files_done": 1,
+         "pages_done": 12, "current_file": "notes.pdf", "lesson_id": null,
+         "lesson_name": "", "errors": [], "error": "", "processing_time_ms": null}
+    """
+    job = get_object_or_404(UploadJob.objects.select_related("lesson"), id=job_id, user=request.user)
+    fail_if_stale(job)
+    return JsonResponse(job.progress())
+
+
+def api_upload_stream(request: HttpRequest, job_id: int) -> StreamingHttpResponse:
+    """
+    SSE endpoint that streams an upload job's progress.
     
-    except ValueError as e:
-        return JsonResponse({"error": str(e)}, status=400)
+    Each event is the job's progress snapshot (see api_upload_job), plus
+    "page" and "page_count" for page events. The stream ends after the
+    event with status "done" (with lesson_id) or "failed" (with error).
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+    
+    user = request.user
+    if not UploadJob.objects.filter(id=job_id, user=user).exists():
+        return JsonResponse({"error": "Upload not found"}, status=404)
     
-    except Exception as e:
-        return JsonResponse({"error": f"Processing failed: {str(e)}"}, status=500)
+    def stream_progress():
+        # Subscribe before reading the row so no event falls in between
+        subscription = subscribe(user.id)
+        try:
+            event = {"type": "resync"}
+            while True:
+                if event is None or event.get("type") == "resync":
+                    # Connect, heartbeat or missed events: send the stored state
+                    job = UploadJob.objects.select_related("lesson").get(id=job_id)
+                    fail_if_stale(job)
+                    data = job.progress()
+                elif event.get("type") == "upload" and event["job"]["job_id"] == job_id:
+                    # Events only carry the status and current page; the rest is on the row
+                    job = UploadJob.objects.select_related("lesson").get(id=job_id)
+                    data = {**event["job"], **job.progress()}
+                else:
+                    data = None
+                
+                if data is not None:
+                    yield _sse(data)
+                    if data["status"] in (UploadJob.STATUS_DONE, UploadJob.STATUS_FAILED):
+                        return
+                
+                event = subscription.get(timeout=_LIVE_HEARTBEAT_SECONDS)
+        finally:
+            subscription.close()
+    
+    response = StreamingHttpResponse(stream_progress(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 
 # ---------------------------------------------------------------------------
@@ -559,6 +889,7 @@ def api_lessons_list(request: HttpRequest) -> JsonResponse:
     
     Query params:
         ?source_type=recitation|lesson  (optional, default: all)
+        ?updated_since=<server_time>    (optional, delta mode)
     
     Response:
         {
@@ -568,36 +899,78 @@ def api_lessons_list(request: HttpRequest) -> JsonResponse:
                     "title": "Introduction to Photosynthesis",
                     "source_type": "lesson",
                     "created_at": "2026-03-07T10:30:00Z",
+                    "updated_at": "2026-03-07T10:31:00Z",
                     "page_count": 15
                 }
-            ]
+            ],
+            "server_time": "2026-03-07T10:35:00Z"
         }
+
+    The response carries an ETag; a request with a matching If-None-Match
+    gets 304 Not Modified. In delta mode ("delta": true) "lessons" only holds
+    lessons changed since `updated_since` (pass back a previous server_time)
+    and "lesson_ids" lists every current lesson id, in order, so the client
+    can drop deleted lessons.
     """
+    server_time = timezone.now()
     source_type = request.GET.get('source_type', '').strip()
+
+    try:
+        updated_since = parse_datetime(request.GET.get('updated_since', '').strip())
+    except ValueError:
+        updated_since = None
+    if updated_since is None and request.GET.get('updated_since'):
+        return JsonResponse({"error": "Invalid updated_since"}, status=400)
+    if updated_since and timezone.is_naive(updated_since):
+        updated_since = timezone.make_aware(updated_since, dt_timezone.utc)
     
     # Build query
     lessons_query = Lesson.objects.filter(user=request.user)
     
     if source_type in [Lesson.SOURCE_RECITATION, Lesson.SOURCE_LESSON]:
         lessons_query = lessons_query.filter(source_type=source_type)
+
+    # Any create, delete, rename or content change moves the count or the
+    # latest updated_at, so one aggregate query decides whether anything changed
+    state = lessons_query.aggregate(count=Count('id'), last_updated=Max('updated_at'))
+    last_updated = state['last_updated'].isoformat() if state['last_updated'] else ''
+    etag_source = f"{_LESSONS_LIST_FORMAT}:{request.user.id}:{source_type}:{state['count']}:{last_updated}"
+    etag = f'"{hashlib.sha256(etag_source.encode()).hexdigest()[:32]}"'
+
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
     
     # Order by most recent first
     lessons = lessons_query.order_by('-created_at')[:100]
-    
+
     # Serialize
     lessons_data = []
+    lesson_ids = []
     for lesson in lessons:
-        page_count = lesson.transcript_chunks.count()
-        
+        lesson_ids.append(lesson.id)
+        # Overlap the window so updates committed while the previous response
+        # was being built are not missed
+        if updated_since and lesson.updated_at < updated_since - _LESSONS_DELTA_OVERLAP:
+            continue
         lessons_data.append({
             'id': lesson.id,
             'title': lesson.title,
             'source_type': lesson.source_type,
             'created_at': lesson.created_at.isoformat(),
-            'page_count': page_count,
+            'updated_at': lesson.updated_at.isoformat(),
+            'page_count': lesson.chunk_count,
         })
-    
-    return JsonResponse({'lessons': lessons_data})
+
+    data = {'lessons': lessons_data, 'server_time': server_time.isoformat()}
+    if updated_since:
+        data['delta'] = True
+        data['lesson_ids'] = lesson_ids
+
+    response = JsonResponse(data)
+    response['ETag'] = etag
+    return response
 
 
 # ---------------------------------------------------------------------------
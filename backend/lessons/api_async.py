@@ -0,0 +1,251 @@
+"""
+Async (ASGI) variants of the SSE endpoints.
+
+Served instead of the sync views in lessons.api when the app runs under
+meet_lessons.asgi (settings.ASYNC_STREAMING). An open EventSource then costs
+a coroutine on the event loop instead of a whole worker thread.
+
+Session auth endpoints (login required):
+- GET /api/questions/<id>/stream/
+- GET /api/sessions/live/
+- GET /api/uploads/<id>/stream/
+"""
+
+import asyncio
+import json
+import time
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.http import HttpRequest, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from accounts.models import SubscriberProfile
+from billing.entitlements import user_has_active_subscription
+
+from .answering import build_context
+from .api import (
+    _LIVE_HEARTBEAT_SECONDS,
+    _PENDING_POLL_SECONDS,
+    _PENDING_STALE_SECONDS,
+    _PENDING_WAIT_SECONDS,
+    _resume_offset,
+    _sse,
+)
+from .generation import claim_question, get_generation, is_abandoned, start_generation_async
+from .models import Lesson, QuestionAnswer, UploadJob
+from .notifications import AsyncSubscription, subscribe
+from .uploads import fail_if_stale
+
+
+def _event_stream(stream) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(stream, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+# ---------------------------------------------------------------------------
+# GET /api/questions/<id>/stream/
+# ---------------------------------------------------------------------------
+
+
+@csrf_exempt
+async def api_question_stream_async(request: HttpRequest, question_id: int) -> StreamingHttpResponse:
+    """Async version of lessons.api.api_question_stream (same SSE events and resume ids)."""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+
+    try:
+        qa = await QuestionAnswer.objects.select_related("lesson").aget(id=question_id, user=user)
+    except QuestionAnswer.DoesNotExist:
+        return JsonResponse({"error": "Question not found"}, status=404)
+
+    offset = _resume_offset(request)
+
+    # If already answered, return the (rest of the) stored answer as a single SSE event
+    if qa.has_answer:
+        async def already_answered():
+            if offset <= len(qa.answer):
+                data = {'token': qa.answer[offset:], 'done': True}
+            else:
+                data = {'token': qa.answer, 'reset': True, 'done': True}
+            yield _sse(data, len(qa.answer))
+        return StreamingHttpResponse(already_answered(), content_type="text/event-stream")
+
+    # Attach to this process's in-flight generation, if any
+    running = get_generation(qa.id)
+
+    if running is None:
+        # Answer is being generated by another process: follow its checkpoints
+        follow = not is_abandoned(qa, _PENDING_STALE_SECONDS)
+
+        if not follow:
+            if not await sync_to_async(user_has_active_subscription)(user):
+                async def not_subscribed():
+                    yield f"data: {json.dumps({'error': 'subscription_required', 'done': True})}\n\n"
+                return StreamingHttpResponse(not_subscribed(), content_type="text/event-stream")
+            follow = not await sync_to_async(claim_question)(qa)
+
+        if follow:
+            return _event_stream(_follow_answer_async(qa.id, offset))
+
+        prompt_settings = await sync_to_async(SubscriberProfile.get_prompt_settings)(user)
+        full_context = await sync_to_async(build_context)(qa.lesson, question=qa.question)
+
+        running = start_generation_async(qa.id, {
+            "question": qa.question,
+            "context": full_context,
+            "source_type": qa.lesson.source_type if qa.lesson else "recitation",
+            **prompt_settings,
+        })
+
+    async def stream_tokens():
+        reset = offset > running.length
+        async for item in running.aiter_text(0 if reset else offset):
+            if item is None:
+                yield ": waiting\n\n"
+                continue
+            end, text = item
+            data = {'token': text, 'done': False}
+            if reset:
+                data['reset'] = True
+                reset = False
+            yield _sse(data, end)
+
+        yield _sse({'token': '', 'done': True})
+
+    return _event_stream(stream_tokens())
+
+
+async def _follow_answer_async(qa_id: int, offset: int):
+    """Async version of lessons.api._follow_answer."""
+    sent = offset
+    deadline = time.time() + _PENDING_WAIT_SECONDS
+    while time.time() < deadline:
+        row = await QuestionAnswer.objects.filter(id=qa_id).values_list("answer", "status").afirst()
+        if row is None:
+            break
+        answer, status = row
+        if len(answer) > sent:
+            yield _sse({'token': answer[sent:], 'done': False}, len(answer))
+            sent = len(answer)
+            deadline = time.time() + _PENDING_WAIT_SECONDS
+        if status == QuestionAnswer.STATUS_DONE:
+            if len(answer) < sent:
+                yield _sse({'token': answer, 'reset': True, 'done': False}, len(answer))
+            yield _sse({'token': '', 'done': True})
+            return
+        yield ": waiting\n\n"
+        await asyncio.sleep(_PENDING_POLL_SECONDS)
+    yield _sse({'error': 'answer_timeout', 'done': True})
+
+
+# ---------------------------------------------------------------------------
+# GET /api/sessions/live/
+# ---------------------------------------------------------------------------
+
+
+@csrf_exempt
+async def api_sessions_live_async(request: HttpRequest) -> StreamingHttpResponse:
+    """Async version of lessons.api.api_sessions_live (same query params and events)."""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+
+    mode = request.GET.get('mode', 'recitation')
+    lesson_id = request.GET.get('lesson_id')
+
+    async def resolve_target_lesson():
+        if mode == 'lesson' and lesson_id:
+            return await Lesson.objects.filter(id=lesson_id, user=user).afirst()
+        return await Lesson.objects.filter(
+            user=user,
+            source_type=Lesson.SOURCE_RECITATION,
+            created_at__date=date.today()
+        ).order_by('-created_at').afirst()
+
+    async def stream_new_questions():
+        subscription = subscribe(user.id, AsyncSubscription)
+        try:
+            target_lesson = None
+            if mode == 'lesson' and lesson_id:
+                target_lesson = await resolve_target_lesson()
+                if target_lesson is None:
+                    yield f"data: {json.dumps({'error': 'lesson_not_found'})}\n\n"
+                    return
+
+            last_id = 0
+            event = {"type": "resync"}  # send existing questions on connect
+            while True:
+                if event is None:
+                    yield ": heartbeat\n\n"
+                else:
+                    if mode != 'lesson' and (
+                        event.get("type") == "resync"
+                        or target_lesson is None
+                        or event.get("lesson_id") != target_lesson.id
+                    ):
+                        target_lesson = await resolve_target_lesson()
+
+                    relevant = event.get("type") == "resync" or (
+                        target_lesson is not None and event.get("lesson_id") == target_lesson.id
+                    )
+                    if target_lesson is not None and relevant:
+                        async for qa in target_lesson.qas.filter(id__gt=last_id).order_by('id'):
+                            last_id = qa.id
+                            yield f"data: {json.dumps({
+                                'question_id': qa.id,
+                                'question_text': qa.question,
+                                'lesson_id': target_lesson.id,
+                                'timestamp': qa.created_at.isoformat()
+                            })}\n\n"
+
+                event = await subscription.get(timeout=_LIVE_HEARTBEAT_SECONDS)
+        finally:
+            subscription.close()
+
+    return _event_stream(stream_new_questions())
+
+
+# ---------------------------------------------------------------------------
+# GET /api/uploads/<id>/stream/
+# ---------------------------------------------------------------------------
+
+
+@csrf_exempt
+async def api_upload_stream_async(request: HttpRequest, job_id: int) -> StreamingHttpResponse:
+    """Async version of lessons.api.api_upload_stream (same events)."""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+
+    if not await UploadJob.objects.filter(id=job_id, user=user).aexists():
+        return JsonResponse({"error": "Upload not found"}, status=404)
+
+    async def stream_progress():
+        subscription = subscribe(user.id, AsyncSubscription)
+        try:
+            event = {"type": "resync"}
+            while True:
+                if event is None or event.get("type") == "resync":
+                    job = await UploadJob.objects.select_related("lesson").aget(id=job_id)
+                    await sync_to_async(fail_if_stale)(job)
+                    data = job.progress()
+                elif event.get("type") == "upload" and event["job"]["job_id"] == job_id:
+                    job = await UploadJob.objects.select_related("lesson").aget(id=job_id)
+                    data = {**event["job"], **job.progress()}
+                else:
+                    data = None
+
+                if data is not None:
+                    yield _sse(data)
+                    if data["status"] in (UploadJob.STATUS_DONE, UploadJob.STATUS_FAILED):
+                        return
+
+                event = await subscription.get(timeout=_LIVE_HEARTBEAT_SECONDS)
+        finally:
+            subscription.close()
+
+    return _event_stream(stream_progress())
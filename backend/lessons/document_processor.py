@@ -6,19 +6,33 @@ Handles:
 - PDF → image → OCR (for scanned PDFs)
 - Image OCR (Pillow + pytesseract)
 - AI lesson naming (OpenAI)
+
+OCR runs on the process pool in lessons.ocr: all scanned pages and images of
+an upload are queued up front and collected in order. Results are cached by
+content (lessons.ocr_cache), so re-uploaded files and pages skip OCR.
 """
 
-import io
+import contextlib
+import logging
+import os
+import tempfile
 import time
-from typing import BinaryIO
+from concurrent.futures import Future
+from typing import BinaryIO, Callable
 
 import fitz  # PyMuPDF
-import pytesseract
 from django.conf import settings
-from openai import OpenAI
-from PIL import Image, ImageEnhance
+from django.db import transaction
+from django.utils import timezone
 
+from . import ocr
+from .ai import get_client
 from .models import Lesson, TranscriptChunk
+from .ocr import PDF_RENDER_DPI
+from .ocr_cache import OcrCache
+from .retrieval import build_lesson_index
+
+logger = logging.getLogger(__name__)
 
 # File type validation
 ALLOWED_IMAGE_TYPES = {
@@ -34,11 +48,22 @@ ALLOWED_PDF_TYPE = 'application/pdf'
 MAX_FILES_PER_UPLOAD = 100
 MAX_TOTAL_SIZE_MB = 100
 MAX_FILE_SIZE_MB = 10
-MAX_IMAGE_DIMENSION = 4000
+
+# Page chunks inserted per INSERT statement
+CHUNK_BATCH_SIZE = 500
+
+# Bytes needed to recognize a file type
+MAGIC_HEADER_BYTES = 32
 
 # OCR settings
 MIN_TEXT_PER_PAGE = 10  # chars - if less, try OCR as fallback
-PDF_RENDER_DPI = 300
+
+
+def ocr_cache() -> OcrCache | None:
+    """The shared OCR result cache, or None when OCR_CACHE_MAX_MB is 0."""
+    if settings.OCR_CACHE_MAX_MB <= 0:
+        return None
+    return OcrCache(settings.OCR_CACHE_DIR, settings.OCR_CACHE_MAX_MB * 1024 * 1024)
 
 
 def validate_file(file, filename: str) -> dict:
@@ -67,9 +92,18 @@ def validate_file(file, filename: str) -> dict:
         }
     
     # Read first bytes for magic number detection
-    header = file.read(32)
+    header = file.read(MAGIC_HEADER_BYTES)
     file.seek(0)
     
+    return detect_file_type(header, filename)
+
+
+def detect_file_type(header: bytes, filename: str) -> dict:
+    """
+    Identify an upload by its first MAGIC_HEADER_BYTES bytes.
+    
+    Returns the same dict as validate_file().
+    """
     # Detect file type by magic bytes
     if header.startswith(b'\xff\xd8\xff'):
         mime_type = 'image/jpeg'
@@ -119,59 +153,14 @@ def validate_file(file, filename: str) -> dict:
     }
 
 
-def preprocess_image(image: Image.Image) -> Image.Image:
-    """
-    Preprocess image for better OCR results.
-    
-    - Resize if too large
-    - Enhance contrast
-    - Convert to grayscale
-    """
-    # Resize if too large
-    if image.width > MAX_IMAGE_DIMENSION or image.height > MAX_IMAGE_DIMENSION:
-        ratio = min(MAX_IMAGE_DIMENSION / image.width, MAX_IMAGE_DIMENSION / image.height)
-        new_size = (int(image.width * ratio), int(image.height * ratio))
-        image = image.resize(new_size, Image.Resampling.LANCZOS)
-    
-    # Convert to RGB if needed (for RGBA, P, etc.)
-    if image.mode not in ('RGB', 'L'):
-        image = image.convert('RGB')
-    
-    # Convert to grayscale
-    image = image.convert('L')
-    
-    # Enhance contrast
-    enhancer = ImageEnhance.Contrast(image)
-    image = enhancer.enhance(1.5)
-    
-    return image
-
-
-def ocr_image(image: Image.Image) -> str:
-    """
-    Run Tesseract OCR on an image.
-    
-    Returns:
-        Extracted text (empty string if no text found)
-    """
-    try:
-        # Preprocess for better OCR
-        processed = preprocess_image(image)
-        
-        # Run Tesseract
-        text = pytesseract.image_to_string(processed, lang='eng')
-        
-        return text.strip()
-    except Exception as e:
-        # Log error but don't crash
-        print(f"OCR error: {e}")
-        return ""
-
-
-def process_pdf(file: BinaryIO, filename: str) -> dict:
+def process_pdf(file: BinaryIO, filename: str, on_page: Callable[[int, int], None] | None = None) -> dict:
     """
     Process a PDF file: extract text or render to images for OCR.
     
+    Pages with too little embedded text are rendered and OCRed concurrently
+    on the OCR pool. on_page(page_num, page_count) is called as each page's
+    text is final, in page order.
+    
     Returns:
         {
             'text': str,
@@ -181,56 +170,42 @@ def process_pdf(file: BinaryIO, filename: str) -> dict:
         }
     """
     start = time.time()
-    pages_data = []
     
     try:
-        # Read PDF into memory
-        file.seek(0)
-        pdf_bytes = file.read()
+        # Uploads already on disk are opened in place; others are read into memory
+        pdf_path = _file_path(file)
+        pdf_bytes = None
+        if pdf_path is None:
+            file.seek(0)
+            pdf_bytes = file.read()
         
-        # Open with PyMuPDF
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        page_count = len(doc)
+        # A PDF seen before (same bytes) reuses its page texts
+        cache = ocr_cache()
+        cache_key = None
+        texts = None
+        if cache is not None:
+            params = (PDF_RENDER_DPI, MIN_TEXT_PER_PAGE)
+            cache_key = cache.file_key("pdf", pdf_path, *params) if pdf_path else cache.key("pdf", pdf_bytes, *params)
+            texts = cache.get_json(cache_key)
         
-        for page_num in range(page_count):
-            page = doc[page_num]
-            
-            # Try text extraction first (fast path)
-            text = page.get_text().strip()
-            
-            # Debug: log extracted text length
-            print(f"PDF {filename} page {page_num + 1}: extracted {len(text)} chars via PyMuPDF")
-            
-            # If text is sparse, try OCR as fallback
-            if len(text) < MIN_TEXT_PER_PAGE:
-                print(f"PDF {filename} page {page_num + 1}: text sparse, trying OCR fallback")
-                
-                # Render page to image
-                pix = page.get_pixmap(dpi=PDF_RENDER_DPI)
-                
-                # Convert to PIL Image
-                img_bytes = pix.tobytes("png")
-                image = Image.open(io.BytesIO(img_bytes))
-                
-                # Run OCR
-                ocr_text = ocr_image(image)
-                
-                # Use OCR text only if it's longer than extracted text
-                if len(ocr_text) > len(text):
-                    print(f"PDF {filename} page {page_num + 1}: OCR produced {len(ocr_text)} chars (better)")
-                    text = ocr_text
-                else:
-                    print(f"PDF {filename} page {page_num + 1}: keeping PyMuPDF text ({len(text)} chars)")
-            
-            # Always keep the text even if it's short
-            # Empty pages are OK - they'll be filtered later
-            
-            pages_data.append({
-                'page_num': page_num + 1,
-                'text': text.strip(),
-            })
+        if texts is not None:
+            logger.info("PDF %s: %d page(s) from OCR cache", filename, len(texts))
+            page_count = len(texts)
+            if on_page is not None:
+                for page_num in range(page_count):
+                    on_page(page_num + 1, page_count)
+        else:
+            texts, complete = _extract_pdf_texts(pdf_path, pdf_bytes, filename, on_page, cache)
+            page_count = len(texts)
+            if cache is not None and complete:
+                cache.set_json(cache_key, texts)
         
-        doc.close()
+        # Always keep the text even if it's short
+        # Empty pages are OK - they'll be filtered later
+        pages_data = [
+            {'page_num': page_num + 1, 'text': text.strip()}
+            for page_num, text in enumerate(texts)
+        ]
         
         # Combine all pages
         full_text = "\n\n".join(p['text'] for p in pages_data if p['text'])
@@ -248,6 +223,94 @@ def process_pdf(file: BinaryIO, filename: str) -> dict:
         raise ValueError(f"Failed to process PDF {filename}: {str(e)}")
 
 
+def _extract_pdf_texts(pdf_path: str | None, pdf_bytes: bytes | None, filename: str,
+                       on_page: Callable[[int, int], None] | None, cache: OcrCache | None) -> tuple[list[str], bool]:
+    """
+    Page texts of a PDF: embedded text, with sparse pages OCRed on the pool.
+    
+    Also returns whether every OCR run succeeded (only then are the texts cached).
+    """
+    # Open with PyMuPDF and try text extraction first (fast path)
+    texts = []
+    with fitz.open(pdf_path, stream=pdf_bytes, filetype="pdf") as doc:
+        page_count = len(doc)
+        for page_num in range(page_count):
+            text = doc[page_num].get_text().strip()
+            
+            logger.debug("PDF %s page %d: extracted %d chars via PyMuPDF", filename, page_num + 1, len(text))
+            texts.append(text)
+    
+    # If text is sparse, try OCR as fallback
+    sparse = [page_num for page_num, text in enumerate(texts) if len(text) < MIN_TEXT_PER_PAGE]
+    futures = {}
+    complete = True
+    with contextlib.ExitStack() as stack:
+        if sparse:
+            logger.info("PDF %s: text sparse on %d page(s), trying OCR fallback", filename, len(sparse))
+            
+            # Pool workers render their page from a file instead of receiving the whole PDF per page
+            if pdf_path is None:
+                pdf_file = stack.enter_context(tempfile.NamedTemporaryFile(suffix=".pdf"))
+                pdf_file.write(pdf_bytes)
+                pdf_file.flush()
+                pdf_path = pdf_file.name
+            
+            futures = {
+                page_num: ocr.submit(settings.OCR_WORKERS, ocr.ocr_pdf_page, pdf_path, page_num, PDF_RENDER_DPI, cache)
+                for page_num in sparse
+            }
+        
+        for page_num in range(page_count):
+            future = futures.get(page_num)
+            if future is not None:
+                ocr_text = future.result()
+                if ocr_text is None:
+                    complete = False
+                    ocr_text = ""
+                
+                # Use OCR text only if it's longer than extracted text
+                if len(ocr_text) > len(texts[page_num]):
+                    logger.debug("PDF %s page %d: OCR produced %d chars (better)", filename, page_num + 1, len(ocr_text))
+                    texts[page_num] = ocr_text
+                else:
+                    logger.debug("PDF %s page %d: keeping PyMuPDF text (%d chars)", filename, page_num + 1, len(texts[page_num]))
+            
+            if on_page is not None:
+                on_page(page_num + 1, page_count)
+    
+    return texts, complete
+
+
+def _file_path(file: BinaryIO) -> str | None:
+    """Path of an upload that is already a file on disk, so it needn't be read into memory."""
+    if hasattr(file, 'temporary_file_path'):
+        return file.temporary_file_path()
+    name = getattr(file, 'name', None)
+    if isinstance(name, str) and os.path.isabs(name) and os.path.isfile(name):
+        return name
+    return None
+
+
+def _submit_image_ocr(file: BinaryIO) -> Future:
+    path = _file_path(file)
+    if path is not None:
+        return ocr.submit(settings.OCR_WORKERS, ocr.ocr_image_path, path, ocr_cache())
+    file.seek(0)
+    return ocr.submit(settings.OCR_WORKERS, ocr.ocr_image_bytes, file.read(), ocr_cache())
+
+
+def _image_result(future: Future, filename: str, start: float) -> dict:
+    try:
+        text = future.result()
+    except Exception as e:
+        raise ValueError(f"Failed to process image {filename}: {str(e)}")
+    
+    return {
+        'text': text,
+        'processing_time_ms': int((time.time() - start) * 1000),
+    }
+
+
 def process_image_file(file: BinaryIO, filename: str) -> dict:
     """
     Process an image file with OCR.
@@ -259,24 +322,7 @@ def process_image_file(file: BinaryIO, filename: str) -> dict:
         }
     """
     start = time.time()
-    
-    try:
-        # Read image
-        file.seek(0)
-        image = Image.open(file)
-        
-        # Run OCR
-        text = ocr_image(image)
-        
-        processing_time_ms = int((time.time() - start) * 1000)
-        
-        return {
-            'text': text,
-            'processing_time_ms': processing_time_ms,
-        }
-    
-    except Exception as e:
-        raise ValueError(f"Failed to process image {filename}: {str(e)}")
+    return _image_result(_submit_image_ocr(file), filename, start)
 
 
 def generate_lesson_name(text: str) -> str:
@@ -296,7 +342,7 @@ def generate_lesson_name(text: str) -> str:
     excerpt = text[:500].strip()
     
     try:
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        client = get_client()
         
         response = client.chat.completions.create(
             model="gpt-4o-mini",
@@ -337,8 +383,8 @@ Lesson title:"""
         
         return title if title else "Untitled Lesson"
     
-    except Exception as e:
-        print(f"AI naming error: {e}")
+    except Exception:
+        logger.warning("AI lesson naming failed", exc_info=True)
         
         # Fallback: use first sentence
         sentences = text.split('.')
@@ -349,117 +395,182 @@ Lesson title:"""
         return "Untitled Lesson"
 
 
-def create_lesson_from_uploads(user, files: list, filenames: list) -> dict:
+class DocumentIngestion:
     """
-    Process uploaded files and create a Lesson with transcribed content.
+    One upload's journey from files to a Lesson.
     
-    Args:
-        user: Django User instance
-        files: List of file objects (BinaryIO)
-        filenames: List of original filenames
+    All per-upload state (collected pages and text, errors) lives on the
+    instance, so any number of uploads can be processed concurrently from
+    threads, coroutines or a worker pool. Use one instance per upload.
     
-    Returns:
-        {
-            'lesson': Lesson instance,
-            'lesson_id': int,
-            'lesson_name': str,
-            'pages_processed': int,
-            'total_processing_time_ms': int,
-            'errors': list[str]
-        }
+    Progress events passed to `progress`:
+        {'stage': 'file', 'filename': str, 'file_index': int}
+        {'stage': 'page', 'filename': str, 'page': int, 'page_count': int}
+        {'stage': 'file_done', 'filename': str, 'file_index': int}
+        {'stage': 'saving'}
     """
-    start = time.time()
     
-    all_text_parts = []
-    total_pages = 0
-    errors = []
+    def __init__(self, user, progress: Callable[[dict], None] | None = None):
+        self.user = user
+        self.report = progress or (lambda event: None)
+        self.pages: list[dict] = []  # [{'page_num': int, 'text': str}, ...]
+        self.text_parts: list[str] = []
+        self.total_pages = 0
+        self.errors: list[str] = []
+    
+    def run(self, files: list, filenames: list) -> dict:
+        """
+        Process the files and create the Lesson.
+        
+        Returns:
+            {
+                'lesson': Lesson instance,
+                'lesson_id': int,
+                'lesson_name': str,
+                'pages_processed': int,
+                'total_processing_time_ms': int,
+                'errors': list[str]
+            }
+        """
+        start = time.time()
+        
+        # Validate every file first and queue image OCR, so images are recognized
+        # on the pool while PDFs are being extracted
+        jobs = self._queue(files, filenames)
+        
+        # Process each file, in upload order
+        for job in jobs:
+            self._process(*job)
+        
+        # Combine all text
+        full_text = "\n\n".join(part for part in self.text_parts if part)
+        
+        logger.debug(
+            "Upload: %d file(s), %d text part(s), %d chars",
+            len(files), len(self.text_parts), len(full_text),
+        )
+        
+        if not full_text or len(full_text.strip()) < 10:
+            error_msg = f"No text could be extracted from uploaded files. Processed {len(files)} files, got {len(self.text_parts)} text parts, total length: {len(full_text)}"
+            if self.errors:
+                error_msg += f". Errors: {', '.join(self.errors)}"
+            raise ValueError(error_msg)
+        
+        # Generate AI lesson name
+        self.report({'stage': 'saving'})
+        lesson_name = generate_lesson_name(full_text)
+        lesson = self._save(lesson_name)
+        
+        # Build the retrieval index now so the first question doesn't pay for it
+        build_lesson_index(lesson)
+        
+        total_processing_time_ms = int((time.time() - start) * 1000)
+        
+        return {
+            'lesson': lesson,
+            'lesson_id': lesson.id,
+            'lesson_name': lesson_name,
+            'pages_processed': self.total_pages,
+            'total_processing_time_ms': total_processing_time_ms,
+            'errors': self.errors,
+        }
     
-    # Process each file
-    for file, filename in zip(files, filenames):
-        try:
-            # Validate file
-            validation = validate_file(file, filename)
+    def _queue(self, files: list, filenames: list) -> list[tuple]:
+        jobs = []
+        for index, (file, filename) in enumerate(zip(files, filenames)):
+            try:
+                # Validate file
+                validation = validate_file(file, filename)
+                
+                if not validation['valid']:
+                    self.errors.append(validation['error'])
+                    continue
+                
+                if validation['file_type'] == 'image':
+                    jobs.append((index, file, filename, 'image', _submit_image_ocr(file), time.time()))
+                else:
+                    jobs.append((index, file, filename, validation['file_type'], None, None))
             
-            if not validation['valid']:
-                errors.append(validation['error'])
+            except Exception as e:
+                self.errors.append(f"{filename}: {str(e)}")
                 continue
-            
+        return jobs
+    
+    def _process(self, index: int, file: BinaryIO, filename: str, file_type: str,
+                 future: Future | None, queued_at: float | None) -> None:
+        self.report({'stage': 'file', 'filename': filename, 'file_index': index})
+        try:
             # Process based on type
-            if validation['file_type'] == 'pdf':
-                result = process_pdf(file, filename)
-                all_text_parts.append(result['text'])
-                total_pages += result['page_count']
-                
-                # Store pages data for later (we'll create chunks after lesson)
-                if not hasattr(create_lesson_from_uploads, '_pages_data'):
-                    create_lesson_from_uploads._pages_data = []
-                create_lesson_from_uploads._pages_data.extend(result['pages'])
+            if file_type == 'pdf':
+                result = process_pdf(
+                    file,
+                    filename,
+                    on_page=lambda page, page_count: self.report(
+                        {'stage': 'page', 'filename': filename, 'page': page, 'page_count': page_count}
+                    ),
+                )
+                self.text_parts.append(result['text'])
+                self.total_pages += result['page_count']
+                self.pages.extend(result['pages'])
             
-            elif validation['file_type'] == 'image':
-                result = process_image_file(file, filename)
-                all_text_parts.append(result['text'])
-                total_pages += 1
+            elif file_type == 'image':
+                result = _image_result(future, filename, queued_at)
+                self.report({'stage': 'page', 'filename': filename, 'page': 1, 'page_count': 1})
+                self.text_parts.append(result['text'])
+                self.total_pages += 1
                 
                 # Store as single page
-                if not hasattr(create_lesson_from_uploads, '_pages_data'):
-                    create_lesson_from_uploads._pages_data = []
-                create_lesson_from_uploads._pages_data.append({
-                    'page_num': total_pages,
+                self.pages.append({
+                    'page_num': self.total_pages,
                     'text': result['text'],
                 })
         
         except Exception as e:
-            errors.append(f"{filename}: {str(e)}")
-            continue
-    
-    # Combine all text
-    full_text = "\n\n".join(part for part in all_text_parts if part)
-    
-    # Debug logging
-    print(f"Total files processed: {len(files)}")
-    print(f"Text parts collected: {len(all_text_parts)}")
-    print(f"Full text length: {len(full_text)}")
-    print(f"Full text preview: {full_text[:200]}")
-    
-    if not full_text or len(full_text.strip()) < 10:
-        error_msg = f"No text could be extracted from uploaded files. Processed {len(files)} files, got {len(all_text_parts)} text parts, total length: {len(full_text)}"
-        if errors:
-            error_msg += f". Errors: {', '.join(errors)}"
-        raise ValueError(error_msg)
-    
-    # Generate AI lesson name
-    lesson_name = generate_lesson_name(full_text)
-    
-    # Create Lesson
-    lesson = Lesson.objects.create(
-        user=user,
-        title=lesson_name,
-        source_type=Lesson.SOURCE_LESSON,
-        meeting_date=None,
-    )
+            self.errors.append(f"{filename}: {str(e)}")
+        
+        self.report({'stage': 'file_done', 'filename': filename, 'file_index': index})
     
-    # Create TranscriptChunk records for each page
-    pages_data = getattr(create_lesson_from_uploads, '_pages_data', [])
-    for page_data in pages_data:
-        if page_data['text']:
-            TranscriptChunk.objects.create(
-                lesson=lesson,
+    def _save(self, lesson_name: str) -> Lesson:
+        # Create the Lesson and a TranscriptChunk per page in one transaction
+        chunks = [
+            TranscriptChunk(
                 speaker="",
                 text=page_data['text'],
                 page_number=page_data['page_num'],
             )
+            for page_data in self.pages
+            if page_data['text']
+        ]
+        
+        with transaction.atomic():
+            # bulk_create skips the chunk post_save signal that counts lesson
+            # content, so the new lesson starts out with its final counts
+            lesson = Lesson.objects.create(
+                user=self.user,
+                title=lesson_name,
+                source_type=Lesson.SOURCE_LESSON,
+                meeting_date=None,
+                chunk_count=len(chunks),
+                total_chars=sum(len(chunk.text) for chunk in chunks),
+                last_activity_at=timezone.now(),
+            )
+            for chunk in chunks:
+                chunk.lesson = lesson
+            TranscriptChunk.objects.bulk_create(chunks, batch_size=CHUNK_BATCH_SIZE)
+        return lesson
+
+
+def create_lesson_from_uploads(user, files: list, filenames: list, progress: Callable[[dict], None] | None = None) -> dict:
+    """
+    Process uploaded files and create a Lesson with transcribed content.
     
-    # Clean up temporary data
-    if hasattr(create_lesson_from_uploads, '_pages_data'):
-        delattr(create_lesson_from_uploads, '_pages_data')
-    
-    total_processing_time_ms = int((time.time() - start) * 1000)
+    Args:
+        user: Django User instance
+        files: List of file objects (BinaryIO)
+        filenames: List of original filenames
+        progress: Optional progress callback (see DocumentIngestion)
     
-    return {
-        'lesson': lesson,
-        'lesson_id': lesson.id,
-        'lesson_name': lesson_name,
-        'pages_processed': total_pages,
-        'total_processing_time_ms': total_processing_time_ms,
-        'errors': errors,
-    }
+    Returns:
+        DocumentIngestion.run()'s result
+    """
+    return DocumentIngestion(user, progress).run(files, filenames)
@@ -0,0 +1,292 @@
+"""
+Single-flight answer generation shared by concurrent answer streams.
+
+Each unanswered QuestionAnswer has at most one OpenAI stream per process.
+The first caller starts it; everyone else (a second dashboard tab, the live
+page, a reconnect) attaches to the same Generation and replays its token
+buffer, so tokens are paid for once and the answer is saved once.
+
+Positions in an answer are character offsets. Subscribers read from any
+offset (0 for a new stream, the SSE Last-Event-ID for a reconnect) and get
+(end_offset, text) pairs back, end_offset being the id of the SSE event.
+
+While streaming, the partial answer is checkpointed to the QuestionAnswer
+row (status "streaming") about once a second, so a client that reconnects
+to another process can resume from the database without a new OpenAI call.
+
+Usage:
+    generation = get_generation(qa.id) or start_generation(qa.id, prompt)
+    for item in generation.iter_text(offset):
+        ...  # None means "no new text yet" (send a heartbeat)
+
+Producers run on the background worker pool (start_generation) or as a task
+on the running event loop (start_generation_async, used by the ASGI views),
+so a generation finishes and is persisted even if every subscriber
+disconnects.
+"""
+
+import asyncio
+import bisect
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from .ai import answer_question_streaming, answer_question_streaming_async, build_prompt
+from .models import QuestionAnswer
+from .workers import submit
+
+logger = logging.getLogger(__name__)
+
+# How long iter_text() waits for new text before yielding None
+_WAIT_SECONDS = 15
+
+# Minimum interval between partial-answer checkpoints
+_CHECKPOINT_SECONDS = 1.0
+
+_IN_PROGRESS = (QuestionAnswer.STATUS_PENDING, QuestionAnswer.STATUS_STREAMING)
+
+
+class Generation:
+    """Token buffer for one in-flight answer, readable from threads and coroutines."""
+
+    def __init__(self, qa_id: int):
+        self.qa_id = qa_id
+        self.tokens: list[str] = []
+        self.done = False
+        self._ends: list[int] = []  # character offset after each token
+        self._cond = threading.Condition()
+        self._async_waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+
+    @property
+    def length(self) -> int:
+        return self._ends[-1] if self._ends else 0
+
+    @property
+    def text(self) -> str:
+        return "".join(self.tokens)
+
+    def _wake(self) -> None:
+        # Caller holds self._cond
+        self._cond.notify_all()
+        for loop, event in list(self._async_waiters):
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                self._async_waiters.discard((loop, event))
+
+    def append(self, token: str) -> None:
+        with self._cond:
+            self.tokens.append(token)
+            self._ends.append(self.length + len(token))
+            self._wake()
+
+    def finish(self) -> None:
+        with self._cond:
+            self.done = True
+            self._wake()
+
+    def _read(self, offset: int) -> list[tuple[int, str]]:
+        # Caller holds self._cond. Text after `offset` as (end_offset, text) pairs.
+        index = bisect.bisect_right(self._ends, offset)
+        items = []
+        for i in range(index, len(self.tokens)):
+            token = self.tokens[i]
+            start = self._ends[i] - len(token)
+            items.append((self._ends[i], token[max(offset - start, 0):]))
+        return items
+
+    def iter_text(self, offset: int = 0, wait_seconds: float = _WAIT_SECONDS):
+        """Yield (end_offset, text) after `offset` until done; yields None while idle."""
+        while True:
+            with self._cond:
+                if offset >= self.length and not self.done:
+                    self._cond.wait(wait_seconds)
+                items = self._read(offset)
+                finished = self.done
+            if not items and not finished:
+                yield None
+            for item in items:
+                yield item
+                offset = item[0]
+            if finished and not items:
+                return
+
+    async def aiter_text(self, offset: int = 0, wait_seconds: float = _WAIT_SECONDS):
+        """Async variant of iter_text() for the ASGI views."""
+        event = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), event)
+        with self._cond:
+            self._async_waiters.add(waiter)
+        try:
+            while True:
+                with self._cond:
+                    items = self._read(offset)
+                    finished = self.done
+                    event.clear()
+                if not items and not finished:
+                    try:
+                        await asyncio.wait_for(event.wait(), wait_seconds)
+                    except asyncio.TimeoutError:
+                        yield None
+                    continue
+                for item in items:
+                    yield item
+                    offset = item[0]
+                if finished and not items:
+                    return
+        finally:
+            with self._cond:
+                self._async_waiters.discard(waiter)
+
+
+_registry: dict[int, Generation] = {}
+_registry_lock = threading.Lock()
+_tasks: set[asyncio.Task] = set()
+
+
+def _reset_after_fork() -> None:
+    # Producers do not survive fork(); the child starts with an empty registry.
+    global _registry, _registry_lock
+    _registry = {}
+    _registry_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_generation(qa_id: int) -> Generation | None:
+    """Return the in-flight generation for a question in this process, if any."""
+    with _registry_lock:
+        return _registry.get(qa_id)
+
+
+def is_abandoned(qa: QuestionAnswer, stale_seconds: float) -> bool:
+    """
+    True if nobody is (still) producing an answer for `qa`.
+
+    Done rows without an answer count as abandoned, as do pending/streaming
+    rows whose last checkpoint is older than `stale_seconds` (the process
+    generating them died).
+    """
+    if qa.status not in _IN_PROGRESS:
+        return not qa.has_answer
+    return (timezone.now() - qa.updated_at).total_seconds() >= stale_seconds
+
+
+def claim_question(qa: QuestionAnswer) -> bool:
+    """
+    Take over answering an abandoned question.
+
+    Compare-and-set on updated_at, so when several processes find the same
+    abandoned row only one of them starts a new generation. Clears any
+    partial answer left by the previous attempt.
+    """
+    return QuestionAnswer.objects.filter(
+        id=qa.id, status=qa.status, updated_at=qa.updated_at,
+    ).update(
+        answer="",
+        answer_html="",
+        answer_html_version=0,
+        status=QuestionAnswer.STATUS_PENDING,
+        updated_at=timezone.now(),
+    ) == 1
+
+
+def _claim(qa_id: int) -> tuple[Generation, bool]:
+    with _registry_lock:
+        generation = _registry.get(qa_id)
+        if generation is not None:
+            return generation, False
+        generation = Generation(qa_id)
+        _registry[qa_id] = generation
+        return generation, True
+
+
+def _release(generation: Generation) -> None:
+    with _registry_lock:
+        if _registry.get(generation.qa_id) is generation:
+            del _registry[generation.qa_id]
+
+
+def _checkpoint(qa_id: int, partial_answer: str) -> None:
+    QuestionAnswer.objects.filter(id=qa_id, status__in=_IN_PROGRESS).update(
+        answer=partial_answer,
+        status=QuestionAnswer.STATUS_STREAMING,
+        updated_at=timezone.now(),
+    )
+
+
+def _persist(qa_id: int, answer: str, latency_ms: int, prompt_tokens: int) -> None:
+    QuestionAnswer.objects.filter(id=qa_id).update(
+        answer=answer,
+        **QuestionAnswer.rendered_fields(answer),
+        model=settings.OPENAI_MODEL,
+        latency_ms=latency_ms,
+        prompt_tokens=prompt_tokens,
+        status=QuestionAnswer.STATUS_DONE,
+        updated_at=timezone.now(),
+    )
+
+
+def _produce(generation: Generation, prompt: dict) -> None:
+    start = time.time()
+    last_checkpoint = start
+    try:
+        messages, prompt_tokens = build_prompt(**prompt)
+        for token in answer_question_streaming(messages):
+            generation.append(token)
+            if time.time() - last_checkpoint >= _CHECKPOINT_SECONDS:
+                _checkpoint(generation.qa_id, generation.text)
+                last_checkpoint = time.time()
+        _persist(generation.qa_id, generation.text, int((time.time() - start) * 1000), prompt_tokens)
+    finally:
+        generation.finish()
+        _release(generation)
+
+
+async def _produce_async(generation: Generation, prompt: dict) -> None:
+    # Database writes go through the worker pool: this task can outlive the
+    # request that started it, and with it the request's thread-sensitive executor.
+    start = time.time()
+    last_checkpoint = start
+    try:
+        messages, prompt_tokens = build_prompt(**prompt)
+        async for token in answer_question_streaming_async(messages):
+            generation.append(token)
+            if time.time() - last_checkpoint >= _CHECKPOINT_SECONDS:
+                await asyncio.wrap_future(submit(_checkpoint, generation.qa_id, generation.text))
+                last_checkpoint = time.time()
+        await asyncio.wrap_future(submit(
+            _persist, generation.qa_id, generation.text, int((time.time() - start) * 1000), prompt_tokens
+        ))
+    except Exception:
+        logger.exception("Answer generation for question %s failed", generation.qa_id)
+    finally:
+        generation.finish()
+        _release(generation)
+
+
+def start_generation(qa_id: int, prompt: dict) -> Generation:
+    """
+    Attach to the question's generation, starting it on the worker pool if needed.
+
+    `prompt` holds the keyword arguments for build_prompt().
+    """
+    generation, created = _claim(qa_id)
+    if created:
+        submit(_produce, generation, prompt)
+    return generation
+
+
+def start_generation_async(qa_id: int, prompt: dict) -> Generation:
+    """Like start_generation(), but runs the producer as a task on the running event loop."""
+    generation, created = _claim(qa_id)
+    if created:
+        task = asyncio.get_running_loop().create_task(_produce_async(generation, prompt))
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
+    return generation
@@ -0,0 +1,51 @@
+"""
+Management command to (re-)render stored answers to HTML.
+
+Run after deploying a new lessons.rendering.ANSWER_RENDERER_VERSION (and once
+after the migration that added answer_html); until then, outdated rows are
+rendered on every page view.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from lessons.models import QuestionAnswer
+from lessons.rendering import ANSWER_RENDERER_VERSION
+
+
+class Command(BaseCommand):
+    help = "Render finished answers whose stored HTML is missing or from an older renderer"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Rows rendered and written per UPDATE batch (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        stale = (
+            QuestionAnswer.objects
+            .filter(status=QuestionAnswer.STATUS_DONE)
+            .exclude(answer="")
+            .filter(~Q(answer_html_version=ANSWER_RENDERER_VERSION) | Q(answer_html=""))
+            .only("id", "answer")
+            .order_by("id")
+        )
+
+        rendered = 0
+        last_id = 0
+        while True:
+            batch = list(stale.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            for qa in batch:
+                for field, value in QuestionAnswer.rendered_fields(qa.answer).items():
+                    setattr(qa, field, value)
+            QuestionAnswer.objects.bulk_update(batch, ["answer_html", "answer_html_version"])
+            rendered += len(batch)
+            last_id = batch[-1].id
+
+        self.stdout.write(self.style.SUCCESS(f"Rendered {rendered} answer(s)"))
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-16 23:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0006_rename_lessons_les_user_id_source_created_idx_lessons_les_user_id_551c8b_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questionanswer',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('done', 'Done')], default='done', max_length=16),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.6 on 2026-10-16 23:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0007_questionanswer_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LessonIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.JSONField(default=dict)),
+                ('signature', models.CharField(blank=True, default='', max_length=64)),
+                ('built_at', models.DateTimeField(auto_now=True)),
+                ('lesson', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='search_index', to='lessons.lesson')),
+            ],
+        ),
+    ]
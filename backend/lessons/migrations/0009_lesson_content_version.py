@@ -0,0 +1,27 @@
+# Generated by Django 5.1.6 on 2026-10-16 23:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0008_lessonindex'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='lessonindex',
+            name='signature',
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='content_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='lessonindex',
+            name='content_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-16 23:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0009_lesson_content_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questionanswer',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='questionanswer',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('streaming', 'Streaming'), ('done', 'Done')], default='done', max_length=16),
+        ),
+    ]
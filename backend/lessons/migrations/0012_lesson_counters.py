@@ -0,0 +1,78 @@
+# Generated by Django 5.1.6 on 2026-10-16 23:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest, Length
+
+
+def backfill_counters(apps, schema_editor):
+    Lesson = apps.get_model('lessons', 'Lesson')
+    LessonTally = apps.get_model('lessons', 'LessonTally')
+    TranscriptChunk = apps.get_model('lessons', 'TranscriptChunk')
+    QuestionAnswer = apps.get_model('lessons', 'QuestionAnswer')
+
+    chunks = TranscriptChunk.objects.filter(lesson=OuterRef('pk')).order_by().values('lesson')
+    qas = QuestionAnswer.objects.filter(lesson=OuterRef('pk')).order_by().values('lesson')
+    Lesson.objects.update(
+        chunk_count=Coalesce(Subquery(chunks.annotate(n=Count('id')).values('n')), 0),
+        total_chars=Coalesce(Subquery(chunks.annotate(n=Sum(Length('text'))).values('n')), 0),
+        qa_count=Coalesce(Subquery(qas.annotate(n=Count('id')).values('n')), 0),
+    )
+    Lesson.objects.update(
+        last_activity_at=Greatest(
+            Coalesce(Subquery(chunks.annotate(t=Max('created_at')).values('t')), 'created_at'),
+            Coalesce(Subquery(qas.annotate(t=Max('created_at')).values('t')), 'created_at'),
+        ),
+    )
+
+    tallies = Lesson.objects.values('user_id', 'source_type').annotate(n=Count('id')).order_by()
+    LessonTally.objects.bulk_create(
+        LessonTally(user_id=row['user_id'], source_type=row['source_type'], lesson_count=row['n'])
+        for row in tallies
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0011_lesson_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='chunk_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='last_activity_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='qa_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='total_chars',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='LessonTally',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_type', models.CharField(choices=[('recitation', 'Recitation (Live Capture)'), ('lesson', 'Lesson (Document Upload)')], max_length=20)),
+                ('lesson_count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lesson_tallies', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'source_type'), name='unique_lesson_tally_per_source_type')],
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
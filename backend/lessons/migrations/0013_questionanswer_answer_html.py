@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-16 23:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0012_lesson_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questionanswer',
+            name='answer_html',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='questionanswer',
+            name='answer_html_version',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
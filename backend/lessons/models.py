@@ -1,5 +1,11 @@
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Length
+from django.utils import timezone
+from django.utils.safestring import SafeString, mark_safe
+
+from .rendering import ANSWER_RENDERER_VERSION, render_markdown
 
 
 class Lesson(models.Model):
@@ -21,8 +27,77 @@ class Lesson(models.Model):
         db_index=True
     )
 
+    # Bumped whenever the lesson's transcript chunks change (see lessons.signals);
+    # keys the prompt-context cache and the stored retrieval index.
+    content_version = models.PositiveIntegerField(default=0)
+
     created_at = models.DateTimeField(auto_now_add=True)
     edited_at = models.DateTimeField(null=True, blank=True)
+    # Any change visible in the lesson list (title, content); drives
+    # /api/lessons/list/ ETags and updated_since deltas. Set explicitly by
+    # queryset .update() calls, which bypass auto_now.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Denormalized stats for the dashboard and lesson list, maintained with
+    # F() updates by lessons.signals and the bulk insert paths.
+    chunk_count = models.PositiveIntegerField(default=0)
+    qa_count = models.PositiveIntegerField(default=0)
+    total_chars = models.PositiveIntegerField(default=0)
+    last_activity_at = models.DateTimeField(null=True, blank=True)
+
+    @classmethod
+    def bump_content_version(cls, lesson_id: int) -> None:
+        cls.objects.filter(id=lesson_id).update(
+            content_version=F("content_version") + 1,
+            updated_at=timezone.now(),
+        )
+
+    @classmethod
+    def record_chunks_added(cls, lesson_id: int, count: int, chars: int) -> None:
+        """Count newly inserted chunks; also bumps the content version."""
+        now = timezone.now()
+        cls.objects.filter(id=lesson_id).update(
+            content_version=F("content_version") + 1,
+            chunk_count=F("chunk_count") + count,
+            total_chars=F("total_chars") + chars,
+            last_activity_at=now,
+            updated_at=now,
+        )
+
+    @classmethod
+    def record_chunks_removed(cls, lesson_id: int, count: int, chars: int) -> None:
+        """Uncount deleted chunks; also bumps the content version."""
+        cls.objects.filter(id=lesson_id).update(
+            content_version=F("content_version") + 1,
+            chunk_count=F("chunk_count") - count,
+            total_chars=F("total_chars") - chars,
+            updated_at=timezone.now(),
+        )
+
+    @classmethod
+    def record_question(cls, lesson_id: int) -> None:
+        cls.objects.filter(id=lesson_id).update(
+            qa_count=F("qa_count") + 1,
+            last_activity_at=timezone.now(),
+        )
+
+    @classmethod
+    def recount_chunks(cls, lesson_id: int) -> None:
+        """
+        Recompute chunk_count and total_chars from the rows; also bumps the content version.
+
+        For writes whose effect on the counters isn't known up front: chunk
+        edits and bulk inserts that skip conflicting rows.
+        """
+        chunks = TranscriptChunk.objects.filter(lesson=OuterRef("pk")).order_by().values("lesson")
+        now = timezone.now()
+        cls.objects.filter(id=lesson_id).update(
+            content_version=F("content_version") + 1,
+            chunk_count=Coalesce(Subquery(chunks.annotate(n=Count("id")).values("n")), 0),
+            total_chars=Coalesce(Subquery(chunks.annotate(n=Sum(Length("text"))).values("n")), 0),
+            last_activity_at=now,
+            updated_at=now,
+        )
 
     class Meta:
         constraints = [
@@ -37,6 +112,41 @@ class Lesson(models.Model):
         ]
 
 
+class LessonTally(models.Model):
+    """Per-user lesson count for one source type (dashboard tabs), kept by lessons.signals."""
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="lesson_tallies")
+    source_type = models.CharField(max_length=20, choices=Lesson.SOURCE_CHOICES)
+    lesson_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "source_type"],
+                name="unique_lesson_tally_per_source_type",
+            ),
+        ]
+
+    @classmethod
+    def adjust(cls, user_id: int, source_type: str, delta: int) -> None:
+        rows = cls.objects.filter(user_id=user_id, source_type=source_type)
+        if rows.update(lesson_count=F("lesson_count") + delta) or delta < 0:
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(user_id=user_id, source_type=source_type, lesson_count=delta)
+        except IntegrityError:
+            # Created concurrently by another request
+            rows.update(lesson_count=F("lesson_count") + delta)
+
+    @classmethod
+    def counts_for_user(cls, user) -> dict[str, int]:
+        """Lesson count per source type, zero for types the user has none of."""
+        counts = {value: 0 for value, _ in Lesson.SOURCE_CHOICES}
+        counts.update(cls.objects.filter(user=user).values_list("source_type", "lesson_count"))
+        return counts
+
+
 class TranscriptChunk(models.Model):
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name="transcript_chunks")
     speaker = models.CharField(max_length=255, blank=True, default="")
@@ -58,7 +168,26 @@ class TranscriptChunk(models.Model):
         ]
 
 
+class LessonIndex(models.Model):
+    """BM25 retrieval index over a lesson's transcript chunks (see lessons.retrieval)."""
+
+    lesson = models.OneToOneField(Lesson, on_delete=models.CASCADE, related_name="search_index")
+    data = models.JSONField(default=dict)
+    content_version = models.PositiveIntegerField(default=0)
+
+    built_at = models.DateTimeField(auto_now=True)
+
+
 class QuestionAnswer(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_STREAMING = 'streaming'
+    STATUS_DONE = 'done'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_STREAMING, 'Streaming'),
+        (STATUS_DONE, 'Done'),
+    ]
+
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name="qas", null=True, blank=True)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="qas")
 
@@ -67,5 +196,87 @@ class QuestionAnswer(models.Model):
 
     model = models.CharField(max_length=128, blank=True, default="")
     latency_ms = models.PositiveIntegerField(null=True, blank=True)
+    # Input tokens of the prompt, counted locally (see lessons.ai.build_prompt)
+    prompt_tokens = models.PositiveIntegerField(null=True, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_DONE)
+
+    # Sanitized HTML of the finished answer, rendered when it is persisted
+    # (see lessons.rendering); empty while the answer is still streaming.
+    answer_html = models.TextField(blank=True, default="")
+    answer_html_version = models.PositiveSmallIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Last write, including partial-answer checkpoints while streaming
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def has_answer(self) -> bool:
+        """True once the answer is complete (partial answers are checkpointed while streaming)."""
+        return self.status == self.STATUS_DONE and bool(self.answer)
+
+    @property
+    def rendered_answer(self) -> SafeString:
+        """The answer as HTML; renders on the fly if the stored HTML is missing or outdated."""
+        if self.answer_html_version == ANSWER_RENDERER_VERSION and self.answer_html:
+            return mark_safe(self.answer_html)
+        return mark_safe(render_markdown(self.answer))
+
+    @staticmethod
+    def rendered_fields(answer: str) -> dict:
+        """answer_html/answer_html_version values for a finished answer, for .update()/.create()."""
+        return {
+            "answer_html": render_markdown(answer),
+            "answer_html_version": ANSWER_RENDERER_VERSION,
+        }
+
+
+class UploadJob(models.Model):
+    """A document upload being OCRed in the background (see lessons.uploads)."""
+
+    STATUS_QUEUED = 'queued'
+    STATUS_PROCESSING = 'processing'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_PROCESSING, 'Processing'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="upload_jobs")
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+
+    file_count = models.PositiveIntegerField(default=0)
+    files_done = models.PositiveIntegerField(default=0)
+    pages_done = models.PositiveIntegerField(default=0)
+    current_file = models.CharField(max_length=255, blank=True, default="")
+
+    lesson = models.ForeignKey(Lesson, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    errors = models.JSONField(default=list, blank=True)  # per-file problems that didn't fail the job
+    error = models.TextField(blank=True, default="")
+    processing_time_ms = models.PositiveIntegerField(null=True, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    # Last progress update; a job that stops updating was lost (see lessons.uploads)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+    def progress(self) -> dict:
+        """Snapshot sent to upload progress streams and GET /api/uploads/<id>/."""
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "file_count": self.file_count,
+            "files_done": self.files_done,
+            "pages_done": self.pages_done,
+            "current_file": self.current_file,
+            "lesson_id": self.lesson_id,
+            "lesson_name": self.lesson.title if self.lesson else "",
+            "errors": self.errors,
+            "error": self.error,
+            "processing_time_ms": self.processing_time_ms,
+        }
@@ -0,0 +1,194 @@
+"""
+Process-wide fan-out of lesson events (new questions) to SSE subscribers.
+
+Publishers call publish(); on Postgres this is a NOTIFY on CHANNEL, so every
+web process sees the event once the publishing transaction commits. Each
+process runs a single listener thread (one extra DB connection, started on
+the first subscribe) that LISTENs on CHANNEL and wakes only the subscribers
+of the event's user.
+
+On other databases (local dev) events are dispatched in-process only.
+
+Usage:
+    subscription = subscribe(user_id)
+    try:
+        event = subscription.get(timeout=15)  # None on timeout
+    finally:
+        subscription.close()
+
+ASGI views pass subscription_class=AsyncSubscription and `await` get().
+
+Events are small dicts, e.g. {"type": "question", "user_id": 1, "lesson_id": 2,
+"question_id": 3}. After the listener reconnects, subscribers receive
+{"type": "resync"} because events may have been missed in between.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.db import connection, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "lessons_events"
+
+_MAX_PENDING_EVENTS = 100
+_RECONNECT_DELAY_SECONDS = 2
+
+
+class Subscription:
+    """A subscriber's event queue. Events that overflow the queue are dropped."""
+
+    def __init__(self, hub: "NotificationHub", user_id: int):
+        self._hub = hub
+        self.user_id = user_id
+        self._queue = queue.Queue(maxsize=_MAX_PENDING_EVENTS)
+
+    def deliver(self, event: dict) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            pass
+
+    def get(self, timeout: float) -> dict | None:
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        self._hub.unsubscribe(self)
+
+
+class AsyncSubscription(Subscription):
+    """
+    Subscription for async (ASGI) consumers.
+
+    Must be created on the event loop; deliveries from the listener thread are
+    handed to the loop with call_soon_threadsafe.
+    """
+
+    def __init__(self, hub: "NotificationHub", user_id: int):
+        super().__init__(hub, user_id)
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=_MAX_PENDING_EVENTS)
+
+    def deliver(self, event: dict) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # loop already closed
+
+    def _put(self, event: dict) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass
+
+    async def get(self, timeout: float) -> dict | None:
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class NotificationHub:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: dict[int, set[Subscription]] = {}
+        self._listener: threading.Thread | None = None
+
+    def subscribe(self, user_id: int, subscription_class=Subscription) -> Subscription:
+        subscription = subscription_class(self, user_id)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        self._ensure_listener()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subs = self._subscribers.get(subscription.user_id)
+            if subs:
+                subs.discard(subscription)
+                if not subs:
+                    del self._subscribers[subscription.user_id]
+
+    def dispatch(self, event: dict) -> None:
+        """Deliver an event to this process's subscribers."""
+        with self._lock:
+            if event.get("type") == "resync":
+                targets = [s for subs in self._subscribers.values() for s in subs]
+            else:
+                targets = list(self._subscribers.get(event.get("user_id"), ()))
+        for subscription in targets:
+            subscription.deliver(event)
+
+    def _ensure_listener(self) -> None:
+        if connection.vendor != "postgresql":
+            return
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(
+                target=self._listen,
+                name="lessons-notify-listener",
+                daemon=True,
+            )
+            self._listener.start()
+
+    def _listen(self) -> None:
+        import psycopg
+
+        params = connections["default"].get_connection_params()
+        first_connect = True
+        while True:
+            try:
+                with psycopg.connect(**params, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {CHANNEL}")
+                    if not first_connect:
+                        self.dispatch({"type": "resync"})
+                    first_connect = False
+                    for notify in conn.notifies():
+                        try:
+                            self.dispatch(json.loads(notify.payload))
+                        except ValueError:
+                            logger.warning("Ignoring malformed notification: %r", notify.payload)
+            except Exception:
+                logger.exception("Notification listener disconnected; reconnecting")
+                time.sleep(_RECONNECT_DELAY_SECONDS)
+
+
+hub = NotificationHub()
+
+
+def _reset_after_fork() -> None:
+    # The listener thread does not survive fork(); the child starts its own.
+    global hub
+    hub = NotificationHub()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def subscribe(user_id: int, subscription_class=Subscription) -> Subscription:
+    """Subscribe to events for `user_id` on this process's hub."""
+    return hub.subscribe(user_id, subscription_class)
+
+
+def publish(event: dict) -> None:
+    """Publish an event to all processes once the current transaction commits."""
+    if connection.vendor == "postgresql":
+        payload = json.dumps(event)
+        transaction.on_commit(lambda: _notify(payload))
+    else:
+        transaction.on_commit(lambda: hub.dispatch(event))
+
+
+def _notify(payload: str) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_notify(%s, %s)", [CHANNEL, payload])
@@ -0,0 +1,207 @@
+"""
+Tesseract OCR on a bounded process pool.
+
+Scanned PDFs and image uploads are OCRed page by page; each page costs a
+page render plus a Tesseract run, both CPU-bound. submit() queues them on a
+per-process pool of OCR_WORKERS spawned processes so the pages of an upload
+are recognized concurrently. Callers keep page order by collecting the
+returned futures in submission order.
+
+Workers are started with the "spawn" method (forking a web worker with open
+DB connections and threads is unsafe) and only import this module, which
+deliberately does not depend on Django. As with any spawned pool, scripts
+that use it need an `if __name__ == "__main__":` guard (manage.py and
+gunicorn have one). Each worker sets OMP_THREAD_LIMIT=1
+so the Tesseract processes it launches stay single-threaded: OCR_WORKERS
+bounds the total number of busy cores.
+
+With OCR_WORKERS=1 (or 0) jobs run inline in the calling thread, and this
+process's environment gets OMP_THREAD_LIMIT=1 for its Tesseract runs.
+"""
+
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import fitz  # PyMuPDF
+import pytesseract
+from PIL import Image, ImageEnhance
+
+from .ocr_cache import OcrCache
+
+logger = logging.getLogger(__name__)
+
+MAX_IMAGE_DIMENSION = 4000
+PDF_RENDER_DPI = 300
+
+_executor: ProcessPoolExecutor | None = None
+_lock = threading.Lock()
+
+
+def _init_worker() -> None:
+    # Inherited by the tesseract subprocesses pytesseract starts
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+def _run_inline(fn, *args) -> Future:
+    # Inline OCR starts Tesseract from this process: single-threaded as well
+    if os.environ.get("OMP_THREAD_LIMIT") != "1":
+        _init_worker()
+    future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def _get_executor(workers: int) -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+    return _executor
+
+
+def _discard_executor(executor: ProcessPoolExecutor) -> None:
+    global _executor
+    with _lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _reset_after_fork() -> None:
+    # Pool management threads do not survive fork(); the child starts its own pool.
+    global _executor, _lock
+    _executor = None
+    _lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def submit(workers: int, fn, *args) -> Future:
+    """Queue fn(*args) on the OCR pool (fn must be a module-level function of this module)."""
+    if workers <= 1:
+        return _run_inline(fn, *args)
+
+    executor = _get_executor(workers)
+    try:
+        return executor.submit(fn, *args)
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM-killed); start a fresh pool for this and later jobs
+        logger.warning("OCR pool broken; restarting it")
+        _discard_executor(executor)
+        return _get_executor(workers).submit(fn, *args)
+
+
+def preprocess_image(image: Image.Image) -> Image.Image:
+    """
+    Preprocess image for better OCR results.
+
+    - Resize if too large
+    - Enhance contrast
+    - Convert to grayscale
+    """
+    # Resize if too large
+    if image.width > MAX_IMAGE_DIMENSION or image.height > MAX_IMAGE_DIMENSION:
+        ratio = min(MAX_IMAGE_DIMENSION / image.width, MAX_IMAGE_DIMENSION / image.height)
+        new_size = (int(image.width * ratio), int(image.height * ratio))
+        image = image.resize(new_size, Image.Resampling.LANCZOS)
+
+    # Convert to RGB if needed (for RGBA, P, etc.)
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    # Convert to grayscale (PDF pages are already rendered in grayscale)
+    if image.mode != 'L':
+        image = image.convert('L')
+
+    # Enhance contrast
+    enhancer = ImageEnhance.Contrast(image)
+    image = enhancer.enhance(1.5)
+
+    return image
+
+
+def _recognize(image: Image.Image) -> str:
+    # Preprocess for better OCR
+    processed = preprocess_image(image)
+
+    # Run Tesseract
+    text = pytesseract.image_to_string(processed, lang='eng')
+
+    return text.strip()
+
+
+def _ocr_cached(image: Image.Image, cache: OcrCache | None, key: str | None) -> str | None:
+    # None if OCR failed; failures are not cached
+    if cache is not None:
+        text = cache.get(key)
+        if text is not None:
+            return text
+
+    try:
+        text = _recognize(image)
+    except Exception:
+        logger.warning("OCR failed", exc_info=True)
+        return None
+
+    if cache is not None:
+        cache.set(key, text)
+    return text
+
+
+def ocr_image(image: Image.Image, cache: OcrCache | None = None, key: str | None = None) -> str:
+    """
+    Run Tesseract OCR on an image.
+
+    With a cache and key, a cached result is returned without running OCR and
+    a new result is stored.
+
+    Returns:
+        Extracted text (empty string if no text found)
+    """
+    text = _ocr_cached(image, cache, key)
+    return text if text is not None else ""
+
+
+def ocr_image_bytes(data: bytes, cache: OcrCache | None = None) -> str:
+    """OCR an encoded image file (pool job)."""
+    key = cache.key("image", data) if cache is not None else None
+    return ocr_image(Image.open(io.BytesIO(data)), cache, key)
+
+
+def ocr_image_path(path: str, cache: OcrCache | None = None) -> str:
+    """OCR the image file at `path` (pool job)."""
+    key = cache.file_key("image", path) if cache is not None else None
+    with Image.open(path) as image:
+        return ocr_image(image, cache, key)
+
+
+def ocr_pdf_page(path: str, page_index: int, dpi: int = PDF_RENDER_DPI, cache: OcrCache | None = None) -> str | None:
+    """
+    Render one page of the PDF at `path` and OCR it (pool job); None if OCR failed.
+
+    The page is rasterized directly in grayscale and its sample buffer is
+    wrapped as the image (no PNG encode/decode or RGB-to-L conversion), so
+    `pix` must stay alive until OCR is done. MuPDF's gray conversion is not
+    PIL's luma transform: colored content comes out lighter than it would
+    from an RGB render converted with Image.convert("L"). With a cache, the rendered
+    pixels are the key: the same page in another PDF is not OCRed again.
+    """
+    with fitz.open(path) as doc:
+        pix = doc[page_index].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+    key = cache.key("page", pix.samples_mv, dpi, pix.width, pix.height) if cache is not None else None
+    image = Image.frombuffer("L", (pix.width, pix.height), pix.samples_mv, "raw", "L", pix.stride, 1)
+    return _ocr_cached(image, cache, key)
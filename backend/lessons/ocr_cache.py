@@ -0,0 +1,142 @@
+"""
+Content-addressed, size-bounded on-disk cache of OCR results.
+
+Students often re-upload the same packet (or the same packet with a page
+added). Results are keyed by a hash of what was recognized, so repeats skip
+Tesseract entirely:
+
+- "pdf":   the final page texts of a whole PDF, keyed by its bytes
+- "page":  the OCR text of one rendered PDF page, keyed by its pixels and DPI
+- "image": the OCR text of an image upload, keyed by its bytes
+
+Entries are plain files under OCR_CACHE_DIR, written atomically, so the web
+processes and the OCR pool workers share one cache. Reads refresh an entry's
+mtime; once the directory grows past its budget the least recently used
+entries are removed. Like lessons.ocr, this module does not depend on Django
+(OcrCache instances are passed to the pool workers).
+
+Bump CACHE_VERSION when a change to rendering or preprocessing would change
+OCR output.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+
+# Sweep once this fraction of the budget has been written since the last sweep
+_SWEEP_FRACTION = 0.1
+
+# Evict down to this fraction of the budget, so sweeps aren't back to back
+_EVICT_TO_FRACTION = 0.9
+
+_written = 0
+_written_lock = threading.Lock()
+
+
+def _reset_after_fork() -> None:
+    global _written, _written_lock
+    _written = 0
+    _written_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class OcrCache:
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def key(self, kind: str, data: bytes | memoryview, *params) -> str:
+        """Cache key for `data` recognized as `kind` with the given parameters."""
+        digest = hashlib.sha256(f"{kind}:{CACHE_VERSION}:{':'.join(map(str, params))}:".encode())
+        digest.update(data)
+        return f"{kind}-{digest.hexdigest()}"
+
+    def file_key(self, kind: str, path: str, *params) -> str:
+        """Like key(), hashing the file at `path` without reading it into memory at once."""
+        digest = hashlib.sha256(f"{kind}:{CACHE_VERSION}:{':'.join(map(str, params))}:".encode())
+        with open(path, "rb") as file:
+            for block in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(block)
+        return f"{kind}-{digest.hexdigest()}"
+
+    def _path(self, key: str) -> Path:
+        digest = key.rsplit("-", 1)[1]
+        return self.directory / digest[:2] / key
+
+    def get(self, key: str) -> str | None:
+        path = self._path(key)
+        try:
+            text = path.read_text(encoding="utf-8")
+            os.utime(path)
+        except OSError:
+            # Missing, or evicted by another process in the meantime
+            return None
+        return text
+
+    def set(self, key: str, text: str) -> None:
+        path = self._path(key)
+        data = text.encode("utf-8")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as out:
+                out.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            logger.warning("Could not write OCR cache entry %s", key, exc_info=True)
+            return
+        self._wrote(len(data))
+
+    def get_json(self, key: str):
+        text = self.get(key)
+        return None if text is None else json.loads(text)
+
+    def set_json(self, key: str, value) -> None:
+        self.set(key, json.dumps(value))
+
+    def _wrote(self, size: int) -> None:
+        global _written
+        with _written_lock:
+            _written += size
+            if _written < self.max_bytes * _SWEEP_FRACTION:
+                return
+            _written = 0
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the cache fits its budget."""
+        entries = []
+        total = 0
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        target = self.max_bytes * _EVICT_TO_FRACTION
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
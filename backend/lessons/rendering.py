@@ -0,0 +1,91 @@
+"""
+Markdown rendering for AI answers.
+
+Answers are rendered once, when they are persisted, and stored on the
+QuestionAnswer row together with ANSWER_RENDERER_VERSION. Bump the version
+whenever the output of render_markdown() changes; rows rendered by an older
+version fall back to rendering at display time until
+`manage.py render_answers` re-renders them.
+
+The output is safe to mark_safe(): raw HTML in the model's Markdown is
+escaped instead of passed through, and links/images may only use http(s),
+mailto or relative URLs.
+"""
+
+import html
+import re
+import threading
+from urllib.parse import urlparse
+
+import markdown as md
+from markdown.extensions import Extension
+from markdown.treeprocessors import Treeprocessor
+
+ANSWER_RENDERER_VERSION = 2
+
+_EXTENSIONS = [
+    'fenced_code',  # Support ```code blocks```
+    'nl2br',        # Convert newlines to <br>
+    'tables',       # Support tables
+    'sane_lists',   # Better list handling
+]
+
+_SAFE_SCHEMES = {"", "http", "https", "mailto"}
+
+# Whitespace and control characters, which browsers ignore inside a URL scheme
+_IGNORED_URL_CHARS_RE = re.compile(r"[\x00-\x20\x7f-\x9f]+")
+
+
+def is_safe_url(url: str) -> bool:
+    """
+    Whether a link/image URL uses an allowed scheme.
+
+    The URL is checked the way a browser reads the attribute: character
+    references are decoded (the serializer leaves "&#115;" alone) and
+    whitespace/control characters dropped, so "JaVa&#115;cript:" or
+    "java\tscript:" count as javascript.
+    """
+    normalized = _IGNORED_URL_CHARS_RE.sub("", html.unescape(url))
+    try:
+        scheme = urlparse(normalized).scheme
+    except ValueError:
+        return False
+    return scheme.lower() in _SAFE_SCHEMES
+
+
+class _UrlFilter(Treeprocessor):
+    def run(self, root):
+        for element in root.iter():
+            for attribute in ("href", "src"):
+                url = element.get(attribute)
+                if url is not None and not is_safe_url(url):
+                    element.set(attribute, "#")
+
+
+class _SafeMarkdown(Extension):
+    """Drop raw HTML support and unsafe link targets."""
+
+    def extendMarkdown(self, md_instance):
+        md_instance.preprocessors.deregister('html_block')
+        md_instance.inlinePatterns.deregister('html')
+        md_instance.treeprocessors.register(_UrlFilter(md_instance), 'url_filter', 0)
+
+
+# Building a Markdown instance loads every extension; reuse one per thread
+# (instances are not thread-safe).
+_local = threading.local()
+
+
+def _renderer() -> md.Markdown:
+    renderer = getattr(_local, "renderer", None)
+    if renderer is None:
+        renderer = md.Markdown(extensions=[*_EXTENSIONS, _SafeMarkdown()])
+        _local.renderer = renderer
+    return renderer
+
+
+def render_markdown(text: str) -> str:
+    """Render Markdown to sanitized HTML."""
+    if not text:
+        return ""
+    return _renderer().reset().convert(text)
@@ -0,0 +1,214 @@
+"""
+Lexical retrieval over lesson pages (BM25).
+
+Lesson-mode questions used to send every TranscriptChunk of an uploaded
+document to OpenAI. Instead, each lesson gets a small BM25 index over its
+page chunks (built at upload time, rebuilt lazily when Lesson.content_version
+moves past the stored version) and only the most relevant pages that fit in
+RETRIEVAL_TOKEN_BUDGET go into the prompt. The index and the formatted page
+texts are cached per (lesson, content_version), so repeated questions on the
+same document skip the chunk scan entirely.
+
+The index is plain JSON so it can be stored on LessonIndex:
+    {
+        "format": 2,
+        "n": 12,                 # number of chunks
+        "avgdl": 231.5,          # average chunk length in terms
+        "df": {"term": 3, ...},  # document frequencies
+        "docs": [{"id": 1, "page": 1, "len": 240, "tokens": 310, "tf": {...}}, ...]
+    }
+
+"tokens" is the formatted page text counted with lessons.tokens, the same
+count the prompt budget uses.
+"""
+
+import math
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Lesson, LessonIndex
+from .tokens import count_tokens
+
+INDEX_FORMAT = 2
+
+_CONTEXT_CACHE_TTL_SECONDS = 60 * 60
+
+# BM25 parameters (standard defaults)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+_STOPWORDS = frozenset("""
+a an and are as at be been but by can did do does for from had has have he her
+his how i if in into is it its me my no not of on or our she so than that the
+their them then there these they this to was we were what when where which who
+why will with you your
+""".split())
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word/number tokens with stopwords removed."""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def format_chunk(chunk) -> str:
+    """Render a chunk the way it appears in the prompt context."""
+    if chunk.page_number:
+        return f"[Page {chunk.page_number}] {chunk.text}"
+    return chunk.text
+
+
+def build_index(chunks) -> dict:
+    """Build a BM25 index over an iterable of TranscriptChunk rows."""
+    docs = []
+    df = Counter()
+    total_len = 0
+
+    for chunk in chunks:
+        terms = tokenize(chunk.text)
+        tf = Counter(terms)
+        df.update(tf.keys())
+        total_len += len(terms)
+        docs.append({
+            "id": chunk.id,
+            "page": chunk.page_number,
+            "len": len(terms),
+            "tokens": count_tokens(format_chunk(chunk), settings.OPENAI_MODEL),
+            "tf": dict(tf),
+        })
+
+    return {
+        "format": INDEX_FORMAT,
+        "n": len(docs),
+        "avgdl": (total_len / len(docs)) if docs else 0.0,
+        "df": dict(df),
+        "docs": docs,
+    }
+
+
+def rank(index: dict, query: str) -> list[tuple[int, float]]:
+    """Return (chunk_id, score) pairs for chunks matching `query`, best first."""
+    query_terms = set(tokenize(query))
+    n = index["n"]
+    avgdl = index["avgdl"] or 1.0
+    df = index["df"]
+
+    idf = {}
+    for term in query_terms:
+        freq = df.get(term, 0)
+        if freq:
+            idf[term] = math.log(1 + (n - freq + 0.5) / (freq + 0.5))
+
+    scored = []
+    for doc in index["docs"]:
+        score = 0.0
+        tf = doc["tf"]
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * doc["len"] / avgdl)
+        for term, term_idf in idf.items():
+            freq = tf.get(term)
+            if freq:
+                score += term_idf * freq * (BM25_K1 + 1) / (freq + norm)
+        if score > 0:
+            scored.append((doc["id"], score))
+
+    scored.sort(key=lambda item: item[1], reverse=True)
+    return scored
+
+
+def select_chunk_ids(index: dict, query: str, top_k: int, token_budget: int) -> list[int]:
+    """
+    Pick the chunk ids to send as context for `query`.
+
+    Small documents that fit in the budget are sent whole. Otherwise the top_k
+    BM25 matches are taken in rank order while they fit; if nothing matches,
+    the leading pages are used instead.
+    """
+    docs = index["docs"]
+    if sum(doc["tokens"] for doc in docs) <= token_budget:
+        return [doc["id"] for doc in docs]
+
+    tokens_by_id = {doc["id"]: doc["tokens"] for doc in docs}
+    candidates = [chunk_id for chunk_id, _ in rank(index, query)] or [doc["id"] for doc in docs]
+
+    selected = []
+    used = 0
+    for chunk_id in candidates:
+        if len(selected) >= top_k:
+            break
+        cost = tokens_by_id[chunk_id]
+        if used + cost > token_budget:
+            continue
+        selected.append(chunk_id)
+        used += cost
+    return selected
+
+
+def get_lesson_index(lesson: Lesson) -> dict:
+    """Load the stored index for a lesson, rebuilding it if missing or stale."""
+    stored = LessonIndex.objects.filter(lesson=lesson).first()
+    if (
+        stored
+        and stored.content_version == lesson.content_version
+        and stored.data.get("format") == INDEX_FORMAT
+    ):
+        return stored.data
+
+    return build_lesson_index(lesson)
+
+
+def build_lesson_index(lesson: Lesson) -> dict:
+    """(Re)build and store the BM25 index for a lesson."""
+    data = build_index(lesson.transcript_chunks.order_by("created_at", "id"))
+    LessonIndex.objects.update_or_create(
+        lesson=lesson,
+        defaults={"data": data, "content_version": lesson.content_version},
+    )
+    return data
+
+
+def _context_cache_key(lesson: Lesson) -> str:
+    return f"lesson_context:{lesson.id}:{lesson.content_version}"
+
+
+def _load_lesson_context(lesson: Lesson) -> dict:
+    """
+    Index + formatted page texts for a lesson, cached per content version.
+
+    Any chunk change bumps Lesson.content_version, so stale entries are never
+    read again and simply expire.
+    """
+    key = _context_cache_key(lesson)
+    entry = cache.get(key)
+    if entry is None:
+        index = get_lesson_index(lesson)
+        pages = {
+            chunk.id: format_chunk(chunk)
+            for chunk in lesson.transcript_chunks.only("id", "page_number", "text")
+        }
+        entry = {"index": index, "pages": pages}
+        cache.set(key, entry, _CONTEXT_CACHE_TTL_SECONDS)
+    return entry
+
+
+def retrieve_context(lesson: Lesson, question: str) -> str:
+    """Build the lesson-mode prompt context from the pages most relevant to `question`."""
+    entry = _load_lesson_context(lesson)
+    index = entry["index"]
+    pages = entry["pages"]
+
+    selected = set(select_chunk_ids(
+        index,
+        question,
+        top_k=settings.RETRIEVAL_TOP_K,
+        token_budget=settings.RETRIEVAL_TOKEN_BUDGET,
+    ))
+    # Keep document order; skip ids missing from a racing rebuild
+    return "\n".join(
+        pages[doc["id"]]
+        for doc in index["docs"]
+        if doc["id"] in selected and doc["id"] in pages
+    )
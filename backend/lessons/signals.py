@@ -0,0 +1,87 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F, QuerySet
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Lesson, LessonTally, QuestionAnswer, TranscriptChunk
+from .notifications import publish
+
+User = get_user_model()
+
+
+def _is_deletion_of(origin, *models) -> bool:
+    if isinstance(origin, QuerySet):
+        return origin.model in models
+    return isinstance(origin, models)
+
+
+def _bump_cached_lesson(chunk: TranscriptChunk) -> None:
+    # Keep an already-loaded lesson in step so the same request sees the new version
+    if TranscriptChunk.lesson.is_cached(chunk):
+        chunk.lesson.content_version += 1
+
+
+@receiver(post_save, sender=TranscriptChunk)
+def _chunk_saved(sender, instance, created, **kwargs):
+    if created:
+        Lesson.record_chunks_added(instance.lesson_id, 1, len(instance.text))
+    else:
+        # An edit may change the text length; recount rather than track the old value
+        Lesson.recount_chunks(instance.lesson_id)
+    _bump_cached_lesson(instance)
+
+
+@receiver(post_delete, sender=TranscriptChunk)
+def _chunk_deleted(sender, instance, origin=None, **kwargs):
+    # Chunks removed by a lesson (or account) cascade don't need a version bump
+    # or recount: their lesson is going away too
+    if _is_deletion_of(origin, Lesson, User):
+        return
+    Lesson.record_chunks_removed(instance.lesson_id, 1, len(instance.text))
+    _bump_cached_lesson(instance)
+
+
+@receiver(post_save, sender=Lesson)
+def _lesson_saved(sender, instance, created, **kwargs):
+    if created:
+        LessonTally.adjust(instance.user_id, instance.source_type, 1)
+
+
+@receiver(post_delete, sender=Lesson)
+def _lesson_deleted(sender, instance, origin=None, **kwargs):
+    if _is_deletion_of(origin, User):
+        return
+    LessonTally.adjust(instance.user_id, instance.source_type, -1)
+
+
+@receiver(pre_save, sender=QuestionAnswer)
+def _render_answer(sender, instance, update_fields=None, **kwargs):
+    # Queryset .update() paths (lessons.generation) pass rendered_fields() themselves;
+    # a save(update_fields=...) must list answer_html for the render to be stored
+    if update_fields is not None and "answer_html" not in update_fields:
+        return
+    if instance.status != QuestionAnswer.STATUS_DONE:
+        return
+    for field, value in QuestionAnswer.rendered_fields(instance.answer).items():
+        setattr(instance, field, value)
+
+
+@receiver(post_save, sender=QuestionAnswer)
+def _question_created(sender, instance, created, **kwargs):
+    if not created:
+        return
+    if instance.lesson_id:
+        Lesson.record_question(instance.lesson_id)
+    publish({
+        "type": "question",
+        "user_id": instance.user_id,
+        "lesson_id": instance.lesson_id,
+        "question_id": instance.id,
+    })
+
+
+@receiver(post_delete, sender=QuestionAnswer)
+def _question_deleted(sender, instance, origin=None, **kwargs):
+    if not instance.lesson_id or _is_deletion_of(origin, Lesson, User):
+        return
+    Lesson.objects.filter(id=instance.lesson_id).update(qa_count=F("qa_count") - 1)
@@ -1,33 +1,25 @@
 """
 Custom template tags for markdown rendering.
 """
-import markdown as md
 from django import template
 from django.utils.safestring import mark_safe
 
+from lessons.rendering import render_markdown
+
 register = template.Library()
 
 
 @register.filter(name='markdown')
 def markdown_filter(text):
     """
-    Convert markdown text to HTML.
-    
+    Convert markdown text to sanitized HTML.
+
     Usage in template:
-        {{ qa.answer|markdown }}
+        {{ some_text|markdown }}
+
+    Stored answers are pre-rendered; use {{ qa.rendered_answer }} for those.
     """
     if not text:
         return ""
-    
-    # Configure markdown with extensions for better formatting
-    html = md.markdown(
-        text,
-        extensions=[
-            'fenced_code',  # Support ```code blocks```
-            'nl2br',        # Convert newlines to <br>
-            'tables',       # Support tables
-            'sane_lists',   # Better list handling
-        ]
-    )
-    
-    return mark_safe(html)
+
+    return mark_safe(render_markdown(text))
@@ -0,0 +1,105 @@
+import os
+import tempfile
+from unittest import mock
+
+import fitz
+from django.test import SimpleTestCase, override_settings
+
+from . import ocr, tokens
+from .ai import _fit_context, build_prompt
+from .rendering import render_markdown
+
+
+class RenderMarkdownUrlTests(SimpleTestCase):
+    def assertNeutralized(self, markdown_text):
+        self.assertEqual(render_markdown(markdown_text), '<p><a href="#">x</a></p>')
+
+    def test_plain_javascript_scheme(self):
+        self.assertNeutralized("[x](javascript:alert(1))")
+
+    def test_entity_encoded_scheme(self):
+        self.assertNeutralized("[x](JaVa&#115;cript:alert(1))")
+        self.assertNeutralized("[x](&#x6A;avascript:alert(1))")
+        self.assertNeutralized("[x](javascript&colon;alert(1))")
+
+    def test_whitespace_and_control_characters_in_scheme(self):
+        self.assertNeutralized("[x](java&#x09;script:alert(1))")
+        self.assertNeutralized("[x](java&#x0A;script:alert(1))")
+        self.assertNeutralized("[x](&#x01;javascript:alert(1))")
+        self.assertNeutralized("[x](<java script:alert(1)>)")
+
+    def test_image_data_url(self):
+        self.assertIn('src="#"', render_markdown("![i](data:text/html;base64,PHNjcmlwdD4=)"))
+
+    def test_allowed_urls_kept(self):
+        self.assertIn('href="https://example.com/a?b=1&amp;c=2"', render_markdown("[x](https://example.com/a?b=1&c=2)"))
+        self.assertIn('href="mailto:a@example.com"', render_markdown("[x](mailto:a@example.com)"))
+        self.assertIn('href="/lessons/1/"', render_markdown("[x](/lessons/1/)"))
+
+    def test_raw_html_escaped(self):
+        rendered = render_markdown('<a href="javascript:alert(1)">x</a>')
+        self.assertNotIn("<a ", rendered)
+
+
+class OcrPdfPageRasterTests(SimpleTestCase):
+    def test_pages_use_mupdf_gray_conversion(self):
+        # Colored fills are converted by MuPDF (not PIL's ITU-R 601 luma, which
+        # gives 76/150/29 for these); this pins the OCR input for colored pages.
+        doc = fitz.open()
+        page = doc.new_page(width=100, height=100)
+        for i, color in enumerate([(1, 0, 0), (0, 1, 0), (0, 0, 1)]):
+            page.draw_rect(fitz.Rect(10 + 30 * i, 10, 30 + 30 * i, 30), fill=color, color=None)
+        fd, path = tempfile.mkstemp(suffix=".pdf")
+        os.close(fd)
+        self.addCleanup(os.unlink, path)
+        doc.save(path)
+
+        captured = {}
+
+        def fake_ocr(image, cache, key):
+            captured["image"] = image.copy()
+            return "text"
+
+        with mock.patch.object(ocr, "_ocr_cached", fake_ocr):
+            self.assertEqual(ocr.ocr_pdf_page(path, 0, dpi=72), "text")
+
+        image = captured["image"]
+        self.assertEqual(image.mode, "L")
+        self.assertEqual(image.size, (100, 100))
+        self.assertEqual([image.getpixel((x, 20)) for x in (20, 50, 80)], [110, 211, 53])
+        self.assertEqual(image.getpixel((5, 5)), 255)
+
+
+class FitContextTests(SimpleTestCase):
+    def setUp(self):
+        # Count with the ~4 chars/token estimate, whether or not tiktoken is available
+        patcher = mock.patch.object(tokens, "_encoding", lambda model: None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_lesson_context_keeps_related_pages_in_document_order(self):
+        context = "\n".join([
+            "[Page 1] Apples grow on trees in orchards.",
+            "[Page 2] Plants use photosynthesis to make food.",
+            "[Page 3] Volcanoes erupt molten rock and ash.",
+            "[Page 4] Photosynthesis needs light and water.",
+        ])
+        fitted = _fit_context(context, "How does photosynthesis use light?", 26, "lesson", "gpt-4o-mini")
+        self.assertEqual(fitted, "[Page 2] Plants use photosynthesis to make food.\n[Page 4] Photosynthesis needs light and water.")
+
+    def test_recitation_context_keeps_newest_captions(self):
+        context = "\n".join(f"Teacher: caption number {i}" for i in range(1, 7))
+        fitted = _fit_context(context, "What was said?", 16, "recitation", "gpt-4o-mini")
+        self.assertEqual(fitted, "Teacher: caption number 5\nTeacher: caption number 6")
+
+    def test_context_that_fits_is_unchanged(self):
+        context = "[Page 1] Short page."
+        self.assertEqual(_fit_context(context, "page", 100, "lesson", "gpt-4o-mini"), context)
+
+    @override_settings(PROMPT_TOKEN_BUDGET=300)
+    def test_prompt_within_budget(self):
+        context = "\n".join(f"[Page {i}] " + "fractions and decimals " * 20 for i in range(1, 11))
+        messages, prompt_tokens = build_prompt("What is a fraction?", context, 2, source_type="lesson")
+        self.assertLessEqual(prompt_tokens, 300)
+        self.assertIn("[Page 1]", messages[1]["content"])
+        self.assertNotIn("[Page 10]", messages[1]["content"])
@@ -0,0 +1,68 @@
+"""
+Local token counting for prompt budgets.
+
+Counts use tiktoken's encoding for the model. The Docker image installs
+tiktoken and pre-fetches its encoding into TIKTOKEN_CACHE_DIR; without them
+(local or dev setups, e.g. no network for the encoding download) counts fall
+back to a ~4 characters per token estimate, which is close for English text,
+and a warning is logged.
+"""
+
+import functools
+import logging
+import math
+
+try:
+    import tiktoken
+except ImportError:  # local/dev fallback; required in deployed images
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+_CHARS_PER_TOKEN = 4
+
+# Fallback encoding for models tiktoken doesn't know yet
+_DEFAULT_ENCODING = "o200k_base"
+
+
+@functools.lru_cache(maxsize=8)
+def _encoding(model: str):
+    if tiktoken is None:
+        logger.warning("tiktoken is not installed; estimating tokens for %s", model)
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding(_DEFAULT_ENCODING)
+    except Exception:
+        # e.g. encoding files can't be downloaded; estimate instead
+        logger.warning("tiktoken encoding unavailable for %s; estimating tokens", model, exc_info=True)
+        return None
+
+
+def count_tokens(text: str, model: str) -> int:
+    """Number of tokens in `text` for `model`."""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / _CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str, keep_end: bool = False) -> str:
+    """`text` cut to at most `max_tokens` tokens, keeping its start (or its end)."""
+    if max_tokens <= 0:
+        return ""
+    encoding = _encoding(model)
+    if encoding is None:
+        max_chars = max_tokens * _CHARS_PER_TOKEN
+        if len(text) <= max_chars:
+            return text
+        return text[-max_chars:] if keep_end else text[:max_chars]
+
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[-max_tokens:] if keep_end else tokens[:max_tokens])
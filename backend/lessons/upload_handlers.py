@@ -0,0 +1,159 @@
+"""
+Streaming upload handler for document uploads.
+
+Django's default handlers buffer each file in memory (up to
+FILE_UPLOAD_MAX_MEMORY_SIZE) or in a temporary file, and the upload job then
+copied every file into its own directory. StagedUploadHandler instead writes
+each multipart part straight into a staging directory under
+settings.UPLOAD_JOBS_DIR as it arrives, which enqueue_upload() renames into
+the job's directory, so an upload never sits in memory as a whole.
+
+Each file is checked against the allowed magic bytes as soon as its first
+bytes arrive; unsupported or oversized files are dropped without being
+written to disk and reported in `errors`. The total size and file count are
+enforced while the body is being read.
+
+Usage (before request.FILES/request.POST are accessed):
+    handler = StagedUploadHandler(request)
+    request.upload_handlers = [handler]
+    files = request.FILES.getlist('files')
+    if handler.abort_reason: ...
+"""
+
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+
+from .document_processor import (
+    MAGIC_HEADER_BYTES,
+    MAX_FILE_SIZE_MB,
+    MAX_FILES_PER_UPLOAD,
+    MAX_TOTAL_SIZE_MB,
+    detect_file_type,
+)
+
+
+class StagedUploadedFile(UploadedFile):
+    """An uploaded file that already lives at its final path in the staging directory."""
+
+    def __init__(self, path: Path, name: str, content_type: str, size: int, charset, content_type_extra):
+        super().__init__(open(path, "rb"), name, content_type, size, charset, content_type_extra)
+        self.path = path
+
+    def temporary_file_path(self) -> str:
+        return str(self.path)
+
+
+class StagedUploadHandler(FileUploadHandler):
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.staging_dir = Path(settings.UPLOAD_JOBS_DIR) / f"incoming-{uuid.uuid4().hex}"
+        self.errors: list[str] = []
+        self.abort_reason = ""
+        self._file_index = 0
+        self._total_size = 0
+        self._out = None
+        self._path: Path | None = None
+        self._header = b""
+        self._rejected = False
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self._file_index += 1
+        if self._file_index > MAX_FILES_PER_UPLOAD:
+            self._abort(f"Too many files. Max {MAX_FILES_PER_UPLOAD} files per upload.")
+        self._header = b""
+        self._rejected = False
+        self._out = None
+        self._path = None
+
+    def _abort(self, reason: str) -> None:
+        self.abort_reason = reason
+        self._close_current(remove=True)
+        raise StopUpload(connection_reset=False)
+
+    def _reject(self, error: str) -> None:
+        self.errors.append(error)
+        self._rejected = True
+        self._close_current(remove=True)
+
+    def _close_current(self, remove: bool = False) -> None:
+        if self._out is not None:
+            self._out.close()
+            self._out = None
+        if remove and self._path is not None:
+            self._path.unlink(missing_ok=True)
+            self._path = None
+
+    def _open_current(self) -> None:
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        # Keep upload order; the original name is only kept for display
+        self._path = self.staging_dir / f"{self._file_index - 1:04d}-{os.path.basename(self.file_name)[:100] or 'file'}"
+        self._out = open(self._path, "wb")
+        self._out.write(self._header)
+
+    def receive_data_chunk(self, raw_data, start):
+        self._total_size += len(raw_data)
+        if self._total_size > MAX_TOTAL_SIZE_MB * 1024 * 1024:
+            self._abort(f"Total file size too large: > {MAX_TOTAL_SIZE_MB}MB")
+
+        if self._rejected:
+            return None
+
+        if start + len(raw_data) > MAX_FILE_SIZE_MB * 1024 * 1024:
+            self._reject(f'File too large: {self.file_name} (> {MAX_FILE_SIZE_MB}MB)')
+            return None
+
+        if self._out is None:
+            # Buffer until the magic bytes can be checked
+            self._header += raw_data
+            if len(self._header) < MAGIC_HEADER_BYTES:
+                return None
+            validation = detect_file_type(self._header[:MAGIC_HEADER_BYTES], self.file_name)
+            if not validation['valid']:
+                self._reject(validation['error'])
+                return None
+            self._open_current()
+            self._header = b""
+            return None
+
+        self._out.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if self._rejected:
+            return None
+
+        if self._out is None:
+            # Shorter than the magic header (or empty)
+            if not self._header:
+                self.errors.append(f'Empty file: {self.file_name}')
+                return None
+            validation = detect_file_type(self._header, self.file_name)
+            if not validation['valid']:
+                self.errors.append(validation['error'])
+                return None
+            self._open_current()
+
+        self._close_current()
+        return StagedUploadedFile(
+            self._path,
+            self.file_name,
+            self.content_type,
+            file_size,
+            self.charset,
+            self.content_type_extra,
+        )
+
+    def upload_interrupted(self):
+        self.cleanup()
+
+    def cleanup(self) -> None:
+        """Remove everything staged by this request (files not handed to a job)."""
+        self._close_current()
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
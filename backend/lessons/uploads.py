@@ -0,0 +1,178 @@
+"""
+Background document uploads.
+
+POST /api/lessons/upload/ streams the files into a staging directory under
+settings.UPLOAD_JOBS_DIR (see lessons.upload_handlers), which becomes the
+job's directory once the UploadJob is created; the job is then
+processed on the upload worker pool (lessons.workers.submit_upload), outside
+the request and gunicorn's timeout and apart from answer generation.
+
+Progress is saved on the UploadJob row and announced through the
+notification hub as {"type": "upload", "user_id": ..., "job": {"job_id",
+"status"[, "page", "page_count"]}}. GET /api/uploads/<id>/stream/ reads the
+row on each announcement and sends UploadJob.progress() (plus the current
+page) to the upload page.
+
+Jobs are not persisted across restarts (see lessons.workers): a job that
+hasn't reported progress for STALE_SECONDS (or is still queued after
+QUEUED_STALE_SECONDS) is marked failed when next looked at, and its files
+are removed. A worker that finishes such a job afterwards leaves it failed
+and deletes the lesson it created.
+"""
+
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .document_processor import create_lesson_from_uploads
+from .models import UploadJob
+from .notifications import publish
+from .workers import submit_upload
+
+logger = logging.getLogger(__name__)
+
+# Longest a running job may go without progress (one file's OCR, or naming)
+STALE_SECONDS = 600
+
+# Longest a job may wait in the upload pool's queue behind other uploads
+QUEUED_STALE_SECONDS = 3600
+
+
+def _job_dir(job_id: int) -> Path:
+    return Path(settings.UPLOAD_JOBS_DIR) / str(job_id)
+
+
+def _stored_name(index: int, filename: str) -> str:
+    # Keep upload order; the original name is only kept for display
+    return f"{index:04d}-{os.path.basename(filename)[:100] or 'file'}"
+
+
+def enqueue_upload(user, files: list, staging_dir: Path | None = None, errors: list | None = None) -> UploadJob:
+    """
+    Store uploaded files and queue an UploadJob for them (runs after commit).
+    
+    `staging_dir` holds files already written by StagedUploadHandler; it is
+    moved into place instead of copying the files. `errors` are files the
+    handler rejected, reported with the job's own errors.
+    """
+    job = UploadJob.objects.create(user=user, file_count=len(files), errors=list(errors or []))
+    job_dir = _job_dir(job.id)
+    if staging_dir is not None:
+        for uploaded in files:
+            uploaded.close()
+        os.replace(staging_dir, job_dir)
+    else:
+        job_dir.mkdir(parents=True, exist_ok=True)
+        for index, uploaded in enumerate(files):
+            with open(job_dir / _stored_name(index, uploaded.name), "wb") as out:
+                for chunk in uploaded.chunks():
+                    out.write(chunk)
+
+    transaction.on_commit(lambda: submit_upload(run_upload_job, job.id))
+    return job
+
+
+def _publish(job: UploadJob, **extra) -> None:
+    # Keep the payload small (pg_notify caps it at 8000 bytes): subscribers
+    # read the rest of the job from its row
+    publish({"type": "upload", "user_id": job.user_id, "job": {"job_id": job.id, "status": job.status, **extra}})
+
+
+def _save(job: UploadJob, *fields: str) -> None:
+    job.save(update_fields=[*fields, "updated_at"])
+
+
+def run_upload_job(job_id: int) -> None:
+    """Process an UploadJob's files into a lesson (background job)."""
+    claimed = UploadJob.objects.filter(id=job_id, status=UploadJob.STATUS_QUEUED).update(
+        status=UploadJob.STATUS_PROCESSING, updated_at=timezone.now(),
+    )
+    if not claimed:
+        return
+
+    job = UploadJob.objects.select_related("user").get(id=job_id)
+    job_dir = _job_dir(job.id)
+
+    def on_progress(event: dict) -> None:
+        stage = event["stage"]
+        if stage == "file":
+            job.current_file = event["filename"]
+            _save(job, "current_file")
+            _publish(job)
+        elif stage == "page":
+            job.pages_done += 1
+            _save(job, "pages_done")
+            _publish(job, page=event["page"], page_count=event["page_count"])
+        elif stage == "file_done":
+            job.files_done += 1
+            _save(job, "files_done")
+        elif stage == "saving":
+            # Files rejected by validation never report file_done
+            job.files_done = job.file_count
+            job.current_file = ""
+            _save(job, "files_done", "current_file")
+            _publish(job)
+
+    start = time.time()
+    files = []
+    try:
+        paths = sorted(job_dir.iterdir())
+        filenames = [path.name.split("-", 1)[1] for path in paths]
+        files = [open(path, "rb") for path in paths]
+        _publish(job)
+
+        result = create_lesson_from_uploads(job.user, files, filenames, progress=on_progress)
+        job.status = UploadJob.STATUS_DONE
+        job.lesson = result['lesson']
+        job.errors = [*job.errors, *result['errors']]
+    except ValueError as e:
+        job.status = UploadJob.STATUS_FAILED
+        job.error = str(e)
+    except Exception as e:
+        logger.exception("Upload job %s failed", job.id)
+        job.status = UploadJob.STATUS_FAILED
+        job.error = f"Processing failed: {str(e)}"
+    finally:
+        for file in files:
+            file.close()
+        shutil.rmtree(job_dir, ignore_errors=True)
+
+    job.processing_time_ms = int((time.time() - start) * 1000)
+    # fail_if_stale() may have given up on the job meanwhile (and the user
+    # been told to upload again): don't overwrite that or keep a duplicate lesson
+    finished = UploadJob.objects.filter(id=job.id, status=UploadJob.STATUS_PROCESSING).update(
+        status=job.status,
+        lesson=job.lesson,
+        errors=job.errors,
+        error=job.error,
+        processing_time_ms=job.processing_time_ms,
+        updated_at=timezone.now(),
+    )
+    if not finished:
+        logger.warning("Upload job %s finished after it was marked failed", job.id)
+        if job.lesson is not None:
+            job.lesson.delete()
+        return
+    _publish(job)
+
+
+def fail_if_stale(job: UploadJob) -> bool:
+    """Mark an unfinished job whose worker went away as failed; True if it was."""
+    limit = QUEUED_STALE_SECONDS if job.status == UploadJob.STATUS_QUEUED else STALE_SECONDS
+    if job.is_finished or (timezone.now() - job.updated_at).total_seconds() < limit:
+        return False
+    failed = UploadJob.objects.filter(id=job.id, updated_at=job.updated_at).update(
+        status=UploadJob.STATUS_FAILED,
+        error="Processing was interrupted. Please upload the files again.",
+        updated_at=timezone.now(),
+    )
+    if failed:
+        shutil.rmtree(_job_dir(job.id), ignore_errors=True)
+    job.refresh_from_db()
+    return True
@@ -1,18 +1,30 @@
+from django.conf import settings as django_settings
 from django.urls import path
 
 from .api import (
     api_captions,
+    api_captions_batch,
     api_chunk_delete,
     api_lesson_delete,
     api_lessons_bulk_delete,
     api_lessons_list,
     api_lessons_upload,
+    api_question_detail,
     api_question_stream,
     api_questions,
     api_sessions_live,
+    api_upload_job,
+    api_upload_stream,
 )
+from .api_async import api_question_stream_async, api_sessions_live_async, api_upload_stream_async
 from .views import index, lesson_detail, live_dashboard, settings, upload_page
 
+# Under ASGI the long-lived SSE endpoints use async views
+if django_settings.ASYNC_STREAMING:
+    api_question_stream = api_question_stream_async
+    api_sessions_live = api_sessions_live_async
+    api_upload_stream = api_upload_stream_async
+
 urlpatterns = [
     path("", live_dashboard, name="live_dashboard"),
     path("lessons/", index, name="index"),
@@ -20,10 +32,14 @@ urlpatterns = [
     path("settings/", settings, name="settings"),
     path("lessons/<int:lesson_id>/", lesson_detail, name="lesson_detail"),
     path("api/captions/", api_captions, name="api_captions"),
+    path("api/captions/batch/", api_captions_batch, name="api_captions_batch"),
     path("api/questions/", api_questions, name="api_questions"),
+    path("api/questions/<int:question_id>/", api_question_detail, name="api_question_detail"),
     path("api/questions/<int:question_id>/stream/", api_question_stream, name="api_question_stream"),
     path("api/sessions/live/", api_sessions_live, name="api_sessions_live"),
     path("api/lessons/upload/", api_lessons_upload, name="api_lessons_upload"),
+    path("api/uploads/<int:job_id>/", api_upload_job, name="api_upload_job"),
+    path("api/uploads/<int:job_id>/stream/", api_upload_stream, name="api_upload_stream"),
     path("api/lessons/list/", api_lessons_list, name="api_lessons_list"),
     path("api/lessons/<int:lesson_id>/delete/", api_lesson_delete, name="api_lesson_delete"),
     path("api/lessons/bulk-delete/", api_lessons_bulk_delete, name="api_lessons_bulk_delete"),
@@ -6,7 +6,7 @@ from django.shortcuts import get_object_or_404, redirect, render
 from accounts.models import SubscriberProfile
 from billing.entitlements import billing_is_configured, user_has_active_subscription
 
-from .models import Lesson
+from .models import Lesson, LessonTally
 
 
 @login_required
@@ -21,15 +21,10 @@ def index(request: HttpRequest) -> HttpResponse:
     
     lessons = lessons_query.order_by("-created_at")[:50]
     
-    # Count by type for tabs
-    recitation_count = Lesson.objects.filter(
-        user=request.user, 
-        source_type=Lesson.SOURCE_RECITATION
-    ).count()
-    lesson_count = Lesson.objects.filter(
-        user=request.user, 
-        source_type=Lesson.SOURCE_LESSON
-    ).count()
+    # Count by type for tabs (maintained by lessons.signals)
+    tallies = LessonTally.counts_for_user(request.user)
+    recitation_count = tallies[Lesson.SOURCE_RECITATION]
+    lesson_count = tallies[Lesson.SOURCE_LESSON]
     
     billing_enabled = billing_is_configured()
     subscribed = user_has_active_subscription(request.user)
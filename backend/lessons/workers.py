@@ -0,0 +1,84 @@
+"""
+Process-local background worker pools.
+
+Runs slow work (OpenAI calls, title generation) off the request thread so a
+gunicorn sync worker is released as soon as the response is ready.
+
+Document uploads, which take minutes, run on a separate pool
+(submit_upload(), UPLOAD_WORKERS threads) so they can never occupy the
+threads that generate and persist answers.
+
+Usage (see generation.start_generation and uploads.enqueue_upload):
+    from .workers import submit, submit_upload
+    submit(_produce, generation, prompt)
+    transaction.on_commit(lambda: submit_upload(run_upload_job, job.id))
+
+Jobs run in daemon threads and each one gets its own DB connection, which is
+closed when the job finishes. Jobs are not persisted: anything still queued
+when the process exits is lost, so callers must leave rows in a state the
+request path can recover from (see QuestionAnswer.STATUS_PENDING).
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+logger = logging.getLogger(__name__)
+
+# Pool name -> setting holding its size
+_POOL_SIZE_SETTINGS = {
+    "worker": "BACKGROUND_WORKERS",
+    "upload": "UPLOAD_WORKERS",
+}
+
+_executors: dict[str, ThreadPoolExecutor] = {}
+_lock = threading.Lock()
+
+
+def _get_executor(pool: str) -> ThreadPoolExecutor:
+    executor = _executors.get(pool)
+    if executor is None:
+        with _lock:
+            executor = _executors.get(pool)
+            if executor is None:
+                executor = _executors[pool] = ThreadPoolExecutor(
+                    max_workers=getattr(settings, _POOL_SIZE_SETTINGS[pool]),
+                    thread_name_prefix=f"lessons-{pool}",
+                )
+    return executor
+
+
+def _reset_after_fork() -> None:
+    # Worker threads do not survive fork(); drop the copied executors so the
+    # child lazily builds its own.
+    global _executors, _lock
+    _executors = {}
+    _lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _run(fn, args, kwargs):
+    close_old_connections()
+    try:
+        return fn(*args, **kwargs)
+    except Exception:
+        logger.exception("Background job %s failed", getattr(fn, "__name__", fn))
+        raise
+    finally:
+        connection.close()
+
+
+def submit(fn, *args, **kwargs) -> Future:
+    """Queue fn(*args, **kwargs) on the background pool."""
+    return _get_executor("worker").submit(_run, fn, args, kwargs)
+
+
+def submit_upload(fn, *args, **kwargs) -> Future:
+    """Queue fn(*args, **kwargs) on the upload pool (long document jobs)."""
+    return _get_executor("upload").submit(_run, fn, args, kwargs)
@@ -3,5 +3,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "meet_lessons.settings")
+# Route the SSE endpoints to their async views (see lessons.api_async)
+os.environ.setdefault("ASYNC_STREAMING", "1")
 
 application = get_asgi_application()
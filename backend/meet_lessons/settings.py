@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 from urllib.parse import parse_qsl, urlparse
 
@@ -68,6 +69,10 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "meet_lessons.wsgi.application"
+ASGI_APPLICATION = "meet_lessons.asgi.application"
+
+# Serve the SSE endpoints with async views (set automatically by meet_lessons.asgi)
+ASYNC_STREAMING = os.environ.get("ASYNC_STREAMING", "0") == "1"
 
 DATABASES = {
     "default": {
@@ -102,6 +107,23 @@ if _database_url:
     if sslmode:
         DATABASES["default"].setdefault("OPTIONS", {})["sslmode"] = sslmode
 
+# Cache: shared Redis when REDIS_URL is set (recommended with several web
+# processes, so cache invalidations reach all of them), else per-process memory.
+REDIS_URL = os.environ.get("REDIS_URL", "").strip()
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
     {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator"},
@@ -133,6 +155,46 @@ LOGOUT_REDIRECT_URL = "/accounts/login/"
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "")
 OPENAI_MODEL = os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
 OPENAI_TIMEOUT_SECONDS = int(os.environ.get("OPENAI_TIMEOUT_SECONDS", "15"))
+# Size of each process's pooled (keep-alive) connection pool to the OpenAI API
+OPENAI_MAX_CONNECTIONS = int(os.environ.get("OPENAI_MAX_CONNECTIONS", "20"))
+
+# Background answer generation: POST /api/questions/ returns immediately and a
+# process-local worker pool fills in the answer (clients can opt in per request).
+ASYNC_ANSWERS = os.environ.get("ASYNC_ANSWERS", "0") == "1"
+BACKGROUND_WORKERS = int(os.environ.get("BACKGROUND_WORKERS", "4"))
+# Document upload jobs run on their own pool so they never hold up answers.
+UPLOAD_WORKERS = int(os.environ.get("UPLOAD_WORKERS", "2"))
+
+# Lesson-mode retrieval: documents larger than the token budget only send the
+# top-k BM25-ranked pages that fit in the budget.
+RETRIEVAL_TOP_K = int(os.environ.get("RETRIEVAL_TOP_K", "8"))
+RETRIEVAL_TOKEN_BUDGET = int(os.environ.get("RETRIEVAL_TOKEN_BUDGET", "6000"))
+
+# Upper bound on a question prompt's input tokens (system message, question and
+# context); only the context is trimmed to fit, so the instructions and question
+# are sent even if they alone exceed it. Counted with tiktoken (see lessons.tokens).
+PROMPT_TOKEN_BUDGET = int(os.environ.get("PROMPT_TOKEN_BUDGET", "8000"))
+
+# Number of gunicorn worker processes (gunicorn reads the same variable; the
+# Docker image passes it as --workers).
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", "2"))
+
+# Document uploads: scanned pages and images are OCRed on a per-process pool
+# of this many spawned workers (1 = inline). Each Tesseract run is limited to
+# one thread, so this is the number of cores OCR may occupy per web process;
+# the default splits the host's cores between the web processes.
+OCR_WORKERS = int(os.environ.get(
+    "OCR_WORKERS", str(max(1, min(4, (os.cpu_count() or 1) // max(1, WEB_CONCURRENCY))))
+))
+
+# Uploaded files wait here until their background job has processed them.
+UPLOAD_JOBS_DIR = os.environ.get("UPLOAD_JOBS_DIR", os.path.join(tempfile.gettempdir(), "meet_lessons_uploads"))
+
+# OCR results are cached on disk by content hash (whole PDFs, rendered pages,
+# images), least recently used first out once the cache outgrows
+# OCR_CACHE_MAX_MB. 0 disables the cache.
+OCR_CACHE_DIR = os.environ.get("OCR_CACHE_DIR", os.path.join(tempfile.gettempdir(), "meet_lessons_ocr_cache"))
+OCR_CACHE_MAX_MB = int(os.environ.get("OCR_CACHE_MAX_MB", "256"))
 
 ACCOUNT_EMAIL_REQUIRED = True
 ACCOUNT_USERNAME_REQUIRED = True
@@ -123,9 +123,34 @@ def send_caption(text: str, speaker: str = "", meeting_id: str = "",
     return resp.json()
 
 
+def send_captions_batch(captions: list[dict], meeting_id: str = "",
+                        meeting_title: str = "") -> dict:
+    """
+    Send many captions in one request (e.g. after reconnecting).
+
+    Each caption is {"text": ..., "speaker": ..., "captured_at": ...}.
+    Returns {"lesson_id": ..., "created": ..., "duplicates": ..., "results": [...]},
+    with one {"chunk_id": ..., "status": "created"|"duplicate"|"invalid"} per caption.
+    """
+    url = f"{_base_url()}/api/captions/batch/"
+    resp = requests.post(
+        url,
+        json={
+            "captions": captions,
+            "meeting_id": meeting_id,
+            "meeting_title": meeting_title,
+        },
+        headers=_headers(),
+        timeout=TIMEOUT,
+    )
+    if not resp.ok:
+        raise _response_error(resp)
+    return resp.json()
+
+
 def send_question(question: str, context: str = "", meeting_id: str = "",
                   meeting_title: str = "", lesson_id: int = None,
-                  initial_text: str = "") -> dict:
+                  initial_text: str = "", async_answer: bool = True) -> dict:
     """
     Send a detected question to the backend for AI answering.
 
@@ -136,8 +161,10 @@ def send_question(question: str, context: str = "", meeting_id: str = "",
         meeting_title: Meeting title (optional)
         lesson_id: Selected lesson ID for lesson mode (None for recitation mode)
         initial_text: Initial text for AI title generation
+        async_answer: Return as soon as the question is stored; the backend
+            generates the answer in the background (see fetch_question)
 
-    Returns {"question_id": ..., "lesson_id": ..., "answer": ...}.
+    Returns {"question_id": ..., "lesson_id": ..., "answer": ..., "status": ...}.
     """
     url = f"{_base_url()}/api/questions/"
     payload = {
@@ -146,6 +173,7 @@ def send_question(question: str, context: str = "", meeting_id: str = "",
         "meeting_id": meeting_id,
         "meeting_title": meeting_title,
         "initial_text": initial_text,
+        "async": async_answer,
     }
     
     # Add lesson_id only if provided (lesson mode)
@@ -164,13 +192,14 @@ def send_question(question: str, context: str = "", meeting_id: str = "",
 
 
 @with_retry(max_attempts=3)
-def fetch_lessons() -> list[dict]:
+def fetch_question(question_id: int) -> dict:
     """
-    Fetch list of lessons with source_type='lesson' from backend.
-    
-    Returns list of {"id": ..., "title": ..., "created_at": ...}.
+    Fetch a submitted question and its answer.
+
+    Returns {"question_id": ..., "status": "pending"|"streaming"|"done", "answer": ..., ...};
+    "answer" is partial until the status is "done".
     """
-    url = f"{_base_url()}/api/lessons/list/?source_type=lesson"
+    url = f"{_base_url()}/api/questions/{question_id}/"
     resp = requests.get(
         url,
         headers=_headers(),
@@ -178,8 +207,55 @@ def fetch_lessons() -> list[dict]:
     )
     if not resp.ok:
         raise _response_error(resp)
-    data = resp.json()
-    return data.get('lessons', [])
+    return resp.json()
+
+
+@with_retry(max_attempts=3)
+def sync_lessons() -> tuple[list[dict], bool]:
+    """
+    Bring the local lesson cache (config.cache_lessons) up to date.
+
+    Sends the cached ETag (If-None-Match) and server_time (updated_since), so
+    an unchanged list costs a 304 and a changed one only transfers the
+    lessons that changed. The cache is only rewritten when something changed.
+
+    Returns (lessons, changed).
+    """
+    data = config.load()
+    cached = data.get("cached_lessons") or []
+    etag = data.get("lessons_etag") or ""
+    since = data.get("lessons_server_time")
+
+    url = f"{_base_url()}/api/lessons/list/"
+    params = {"source_type": "lesson"}
+    headers = _headers()
+    conditional = bool(cached and etag and since)
+    if conditional:
+        headers["If-None-Match"] = etag
+        params["updated_since"] = since
+
+    resp = requests.get(url, params=params, headers=headers, timeout=TIMEOUT)
+    if resp.status_code == 304:
+        config.touch_lessons_cache()
+        return cached, False
+    if not resp.ok:
+        raise _response_error(resp)
+
+    body = resp.json()
+    if body.get("delta"):
+        by_id = {lesson["id"]: lesson for lesson in cached}
+        by_id.update({lesson["id"]: lesson for lesson in body.get("lessons", [])})
+        ids = body.get("lesson_ids", [])
+        if any(lesson_id not in by_id for lesson_id in ids):
+            # Local cache is out of step; start over with a full list
+            config.cache_lessons([])
+            return sync_lessons()
+        lessons = [by_id[lesson_id] for lesson_id in ids]
+    else:
+        lessons = body.get("lessons", [])
+
+    config.cache_lessons(lessons, etag=resp.headers.get("ETag", ""), server_time=body.get("server_time"))
+    return lessons, True
 
 
 def check_connection() -> bool:
@@ -41,6 +41,8 @@ DEFAULTS = {
     "hotkey": "print_screen",
     "cached_lessons": [],  # Phase 16.7: Cache lessons locally
     "last_lessons_fetch": None,  # Phase 16.7: Cache timestamp
+    "lessons_etag": "",  # ETag of the cached list (conditional requests)
+    "lessons_server_time": None,  # server_time of the cached list (delta requests)
 }
 
 
@@ -92,15 +94,23 @@ def is_paired() -> bool:
 
 
 # Phase 16.7: Lesson caching functions
-def cache_lessons(lessons: list):
-    """Cache lessons locally with timestamp."""
+def cache_lessons(lessons: list, etag: str = "", server_time: str | None = None):
+    """Cache lessons locally with timestamp (plus the server's ETag/server_time for syncing)."""
     from datetime import datetime
     data = load()
     data["cached_lessons"] = lessons
     data["last_lessons_fetch"] = datetime.now().isoformat()
+    data["lessons_etag"] = etag
+    data["lessons_server_time"] = server_time
     save(data)
 
 
+def touch_lessons_cache():
+    """Mark the cached lessons as fresh without changing them (server said 304)."""
+    from datetime import datetime
+    set_key("last_lessons_fetch", datetime.now().isoformat())
+
+
 def get_cached_lessons() -> list:
     """Get cached lessons."""
     data = load()
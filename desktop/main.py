@@ -451,8 +451,7 @@ class MeetLessonsApp:
     def _fetch_lessons_from_api(self):
         """Fetch lessons from API and update cache."""
         try:
-            lessons = api_client.fetch_lessons()
-            config.cache_lessons(lessons)
+            lessons, _ = api_client.sync_lessons()
             self.root.after(0, lambda: self._update_lessons_ui(lessons, from_cache=False))
             self.root.after(0, lambda: self._update_connection_status(True))
         except Exception as e: